@@ -1,3 +1,19 @@
+MAX_SPRAYS_PER_SEASON = 2
+MAX_GROUP_3_SPRAYS = 2
+# Rain-free hours most foliar fungicides need after application
+RAINFAST_HOURS = 2
+
+# Plain-language statements of the checks below, indexed for the chat assistant
+AFREN_RULES = [
+    f"Apply no more than {MAX_SPRAYS_PER_SEASON} fungicide sprays per crop per season.",
+    "Avoid consecutive SDHI (Group 7) applications, including an SDHI seed treatment followed by "
+    "an SDHI foliar spray, as repeated use selects for resistance.",
+    f"Limit Group 3 (DMI) applications to {MAX_GROUP_3_SPRAYS} per season and rotate or mix with "
+    "other fungicide groups.",
+    f"Don't spray when rain is forecast within the product's rain-fast period (at least {RAINFAST_HOURS} "
+    "hours for most foliar fungicides); washed-off product gives poor control and encourages resistance.",
+]
+
 def check_afren_compliance(
     crop,
     disease,
@@ -18,15 +34,21 @@ def check_afren_compliance(
     warnings = []
 
     # Example AFREN compliance checks
-    if total_sprays > 2:
-        warnings.append("AFREN Warning: More than 2 fungicide sprays per season is not recommended.")
+    if total_sprays > MAX_SPRAYS_PER_SEASON:
+        warnings.append(f"AFREN Warning: More than {MAX_SPRAYS_PER_SEASON} fungicide sprays per season "
+                        "is not recommended.")
 
     if sdhis_used and "Group 7" in current_moa:
         warnings.append("AFREN Warning: Consecutive SDHI applications may lead to resistance.")
 
-    if total_group_3_sprays > 2:
+    if total_group_3_sprays > MAX_GROUP_3_SPRAYS:
         warnings.append("AFREN Warning: Too many Group 3 applications.")
 
+    # rain_forecast_hours is the time until forecast rain; 0 means none is forecast
+    if fungicide_type == "foliar" and 0 < rain_forecast_hours < RAINFAST_HOURS:
+        warnings.append(f"AFREN Warning: Rain forecast within {rain_forecast_hours:g} hours; "
+                        "the spray may not be rain-fast.")
+
     # Add more logic as needed based on AFREN guidelines
 
     return warnings
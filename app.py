@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 
+import perf
+
 # Page configuration
 st.set_page_config(
     page_title="SCA Agronomy Tools",
@@ -8,8 +10,11 @@ st.set_page_config(
     layout="centered",
 )
 
+perf.start_rerun("home")
+
 # Logo
-st.image("sca_logo.jpg", use_container_width=True)
+with perf.span("image"):
+    st.image("sca_logo.jpg", use_container_width=True)
 
 # Custom CSS styling
 st.markdown("""
@@ -83,4 +88,6 @@ st.markdown("""
 
 # Footer
 st.markdown("---")
-st.caption("Developed by South Coastal Agencies")
\ No newline at end of file
+st.caption("Developed by South Coastal Agencies")
+
+perf.end_rerun()
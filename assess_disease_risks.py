@@ -2,7 +2,8 @@ from afren_rules import check_afren_compliance
 
 def assess_sclerotinia_risk(temp, rh, rain, days_since_rain, leaf_wetness_hours,
                              rain_days_last_week, seed_dressed, prior_fungicide_applied,
-                             selected_seed_treatment, selected_prior_fungicide, crop_stage):
+                             selected_seed_treatment, selected_prior_fungicide, crop_stage,
+                             rain_forecast_hours=0):
     score = 0
     if temp >= 13:
         score += 1
@@ -66,7 +67,7 @@ def assess_sclerotinia_risk(temp, rh, rain, days_since_rain, leaf_wetness_hours,
         variety_resistance_rating="moderate",
         disease_visible=False,
         fungicide_type="foliar",
-        rain_forecast_hours=0
+        rain_forecast_hours=rain_forecast_hours
     )
 
     return {
@@ -78,7 +79,8 @@ def assess_sclerotinia_risk(temp, rh, rain, days_since_rain, leaf_wetness_hours,
 
 def assess_septoria_risk(temp, rh, rainfall, crop_stage, has_resistance,
                          seed_dressed, prior_fungicide_applied,
-                         selected_seed_treatment, selected_prior_fungicide):
+                         selected_seed_treatment, selected_prior_fungicide,
+                         rain_forecast_hours=0):
     score = 0
     if rh >= 80 and temp >= 15:
         score += 2
@@ -126,7 +128,7 @@ def assess_septoria_risk(temp, rh, rainfall, crop_stage, has_resistance,
         variety_resistance_rating="moderate",
         disease_visible=False,
         fungicide_type="foliar",
-        rain_forecast_hours=0
+        rain_forecast_hours=rain_forecast_hours
     )
 
     filtered_options = [f for f in all_options if not (sdhis_used and "SDHI" in f["group"])]
@@ -140,7 +142,8 @@ def assess_septoria_risk(temp, rh, rainfall, crop_stage, has_resistance,
 
 def assess_rust_risk(temp, rh, crop_stage, has_resistance,
                      seed_dressed, prior_fungicide_applied,
-                     selected_seed_treatment, selected_prior_fungicide):
+                     selected_seed_treatment, selected_prior_fungicide,
+                     rain_forecast_hours=0):
     score = 0
     if temp >= 15:
         score += 1
@@ -189,7 +192,7 @@ def assess_rust_risk(temp, rh, crop_stage, has_resistance,
         variety_resistance_rating="moderate",
         disease_visible=False,
         fungicide_type="foliar",
-        rain_forecast_hours=0
+        rain_forecast_hours=rain_forecast_hours
     )
 
     return {
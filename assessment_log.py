@@ -0,0 +1,218 @@
+"""
+Append-only log of every disease assessment shown to a user, for auditing advice
+and calibrating thresholds against outcomes.
+
+    log_assessment("fungicide_decision", crop="Wheat", crop_stage="Z39",
+                   inputs={...}, result=result, user="agronomist@example.com")
+    high = query_log({"season": 2025, "crop": "Wheat", "risk_level": "High"})
+
+Records go onto an in-memory queue and a background thread writes them in batches
+as Parquet files partitioned by season and crop (season=2025/crop=Wheat/...), so
+a page never waits on disk. query_log reads the partitions as one pyarrow dataset
+and pushes filters down, skipping partitions and row groups that can't match.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+LOG_DIR = os.environ.get("SCA_ASSESSMENT_LOG_DIR",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "assessment_log"))
+BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 5
+PARTITION_COLUMNS = ["season", "crop"]
+
+logger = logging.getLogger(__name__)
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("logged_at", pa.timestamp("ms")),
+        ("season", pa.int32()),
+        ("crop", pa.string()),
+        ("tool", pa.string()),
+        ("user", pa.string()),
+        ("crop_stage", pa.string()),
+        ("station", pa.string()),
+        ("temperature_c", pa.float64()),
+        ("rh_percent", pa.float64()),
+        ("rain_mm", pa.float64()),
+        ("risk_level", pa.string()),
+        ("recommendation", pa.string()),
+        ("fungicide_options", pa.list_(pa.string())),
+        ("warnings", pa.list_(pa.string())),
+        ("inputs", pa.string()),            # every input as JSON, since they differ by tool
+    ])
+
+
+def _text(value):
+    return None if value is None or value != value else str(value)      # value != value catches NaN
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def make_record(tool, crop, crop_stage, inputs, result, user=None, station=None, logged_at=None):
+    """
+    One log row from an assessment's inputs and the dict an assess_* function
+    returned, coerced to the log schema so one odd value can't sink a batch.
+    """
+    logged_at = logged_at or datetime.now()
+    options = result.get("fungicide_options") or []
+    return {
+        "logged_at": logged_at,
+        "season": logged_at.year,
+        "crop": _text(crop) or "Unknown",
+        "tool": _text(tool),
+        "user": _text(user) or "anonymous",
+        "crop_stage": _text(crop_stage),
+        "station": _text(station),
+        "temperature_c": _number(inputs.get("temp", inputs.get("temperature_c"))),
+        "rh_percent": _number(inputs.get("rh", inputs.get("rh_percent"))),
+        "rain_mm": _number(inputs.get("rain", inputs.get("rain_mm"))),
+        "risk_level": _text(result.get("risk_level", result.get("spore_risk"))),
+        "recommendation": _text(result.get("recommendation", result.get("recommended_action"))),
+        "fungicide_options": [str(o.get("name")) if isinstance(o, dict) else str(o) for o in options],
+        "warnings": [str(w) for w in result.get("warnings", [])],
+        "inputs": json.dumps(inputs, default=str, sort_keys=True),
+    }
+
+
+def write_batch(records, log_dir=LOG_DIR):
+    """
+    Write records as new Parquet files under their season/crop partitions.
+    Existing files are never rewritten.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if not records:
+        return
+    table = pa.Table.from_pylist(records, schema=_schema())
+    ds.write_dataset(table, log_dir, format="parquet", partitioning=PARTITION_COLUMNS,
+                     partitioning_flavor="hive", existing_data_behavior="overwrite_or_ignore",
+                     basename_template=f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet")
+
+
+class AssessmentLogWriter:
+    """
+    Background thread draining a queue of records into write_batch, every BATCH_SIZE
+    records or FLUSH_INTERVAL_SECONDS, whichever comes first. errors counts the
+    records that could not be written.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="assessment-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, record):
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """
+        Block until everything queued so far is on disk.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        batch, waiters = [], []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        # Never take the app down over the audit log. If the batch fails, write the
+        # records one by one so only the bad ones are dropped.
+        try:
+            write_batch(batch, self.log_dir)
+            return
+        except Exception:
+            logger.exception("Assessment log batch of %d records failed; retrying one at a time", len(batch))
+        for record in batch:
+            try:
+                write_batch([record], self.log_dir)
+            except Exception:
+                self.errors += 1
+                logger.exception("Dropped assessment log record: %r", record)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AssessmentLogWriter()
+            atexit.register(_writer.flush, 10)
+        return _writer
+
+
+def log_assessment(tool, crop, crop_stage, inputs, result, user=None, station=None):
+    """
+    Queue one assessment for the log; returns immediately.
+    """
+    get_writer().log(make_record(tool, crop, crop_stage, inputs, result, user, station))
+
+
+# --- Queries ---
+def _filter_expression(filters):
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(column).isin(list(value))
+        else:
+            condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def query_log(filters=None, columns=None, log_dir=LOG_DIR):
+    """
+    Read the log as a DataFrame. filters is {column: value or list of values}
+    (all must match) or a pyarrow expression; partition columns are pruned by
+    directory and the rest are pushed down to the Parquet row groups.
+    """
+    import pandas as pd
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(log_dir):
+        return pd.DataFrame(columns=columns or _schema().names)
+    dataset = ds.dataset(log_dir, format="parquet", partitioning="hive", schema=_schema())
+    if isinstance(filters, dict):
+        filters = _filter_expression(filters)
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
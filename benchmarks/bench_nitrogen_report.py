@@ -0,0 +1,61 @@
+"""
+Time per nitrogen PDF report, built fully in memory.
+
+    python benchmarks/bench_nitrogen_report.py --reports 50 --threads 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from nitrogen_engine import calculate_nitrogen_budget
+from nitrogen_report import build_nitrogen_report, load_logo, load_qr_code
+
+SAMPLE_INPUTS = {
+    "crop_type": "Wheat", "quality_label": "Target Protein (%)", "protein_or_oil": 11.5,
+    "yield_t_ha": 4.0, "nue": 0.6, "nitrate": 5.0, "ammonia": 2.0, "legume_biomass": 0.0,
+    "grain_price": 350.0, "urea_price": 835.0, "uan_price": 725.0,
+}
+SAMPLE_RAIN = {"Jan": 10.0, "Feb": 18.0, "Mar": 24.2, "Apr": 50.2, "May": 13.4, "Jun": 40.0,
+               "Jul": 60.0, "Aug": 55.0, "Sep": 45.0, "Oct": 30.0, "Nov": 34.6, "Dec": 20.6}
+
+
+def build_sample_report():
+    budget = calculate_nitrogen_budget(
+        yield_t_ha=SAMPLE_INPUTS["yield_t_ha"], protein_or_oil=SAMPLE_INPUTS["protein_or_oil"],
+        nitrate=SAMPLE_INPUTS["nitrate"], ammonium=SAMPLE_INPUTS["ammonia"], organic_carbon=1.4,
+        nue=SAMPLE_INPUTS["nue"], grain_price=SAMPLE_INPUTS["grain_price"],
+        urea_price=SAMPLE_INPUTS["urea_price"], uan_price=SAMPLE_INPUTS["uan_price"],
+    )
+    return build_nitrogen_report(SAMPLE_INPUTS, budget, SAMPLE_RAIN, "DPIRD Station Code: ESP", "ESP")
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent builders for the contention run")
+    args = parser.parse_args()
+
+    cold_ms, pdf_bytes = timed(build_sample_report)
+    print(f"First report (decodes logo + QR): {cold_ms:.1f} ms, {len(pdf_bytes) / 1024:.0f} KB")
+    assert load_logo() is load_logo() and load_qr_code() is load_qr_code()
+
+    samples = sorted(timed(build_sample_report)[0] for _ in range(args.reports))
+    print(f"Sequential, {args.reports} reports: median {samples[len(samples) // 2]:.1f} ms, "
+          f"p95 {samples[int(len(samples) * 0.95) - 1]:.1f} ms")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        reports = list(pool.map(lambda _: build_sample_report(), range(args.reports)))
+    elapsed = time.perf_counter() - started
+    assert all(report.startswith(b"%PDF") for report in reports)
+    print(f"{args.threads} threads, {args.reports} reports: {elapsed / args.reports * 1000:.1f} ms/report wall clock, "
+          f"no temp files written")
@@ -0,0 +1,105 @@
+"""
+Cold-start import profile for the app entry point and every page.
+
+Each script's top-level imports (not imports deferred inside functions or button
+handlers) are replayed in a fresh interpreter under `python -X importtime`, and the
+self time is summed per top-level package.
+
+    python benchmarks/importtime_report.py
+    python benchmarks/importtime_report.py --json importtime.json
+    python benchmarks/importtime_report.py --compare importtime.json
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SCRIPTS = ["app.py"] + sorted(os.path.relpath(p, REPO_ROOT) for p in glob.glob(os.path.join(REPO_ROOT, "pages", "*.py")))
+
+# A package whose total grows by more than this (and by at least 5 ms) is flagged by --compare
+REGRESSION_RATIO = 1.2
+
+
+def top_level_imports(script_path):
+    """
+    Import statements that run when the script starts, as source lines.
+    """
+    with open(script_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), script_path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def profile_imports(script):
+    """
+    Run a script's top-level imports under -X importtime and return
+    (total_ms, {package: self_ms}).
+    """
+    script_path = os.path.join(REPO_ROOT, script)
+    bootstrap = "\n".join([f"import sys; sys.path.insert(0, {REPO_ROOT!r})"] + top_level_imports(script_path))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", bootstrap],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script}: imports failed\n{proc.stderr.strip().splitlines()[-1]}")
+
+    per_package = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1000
+    return sum(per_package.values()), dict(per_package)
+
+
+def print_report(results, top):
+    for script, (total_ms, packages) in results.items():
+        print(f"\n{script}: {total_ms:.0f} ms of imports")
+        for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {name:<28} {ms:8.1f} ms")
+
+
+def compare(results, baseline):
+    regressions = []
+    for script, (total_ms, packages) in results.items():
+        if script not in baseline:
+            continue
+        base_total, base_packages = baseline[script]
+        print(f"{script}: {base_total:.0f} ms -> {total_ms:.0f} ms ({total_ms - base_total:+.0f} ms)")
+        for name, ms in packages.items():
+            before = base_packages.get(name, 0.0)
+            if ms - before >= 5 and ms > before * REGRESSION_RATIO:
+                regressions.append(f"{script}: {name} {before:.1f} ms -> {ms:.1f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scripts", nargs="*", default=DEFAULT_SCRIPTS, help="Scripts relative to the repo root")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per script")
+    parser.add_argument("--json", help="Write the profile to this file for later --compare runs")
+    parser.add_argument("--compare", help="Baseline written by an earlier --json run")
+    args = parser.parse_args()
+
+    results = {}
+    for script in args.scripts:
+        try:
+            results[script] = profile_imports(script)
+        except RuntimeError as e:
+            print(f"Skipped {e}")
+    print_report(results, args.top)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(results, baseline)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,219 @@
+"""
+Simulate many concurrent users on the fungicide decision and nitrogen budget pages.
+
+    python benchmarks/load_test_pages.py --users 20 --iterations 3
+    python benchmarks/load_test_pages.py --users 50 --processes 4 --pages nitrogen
+
+Each simulated user is a headless Streamlit session (AppTest) replaying a scripted
+widget sequence, and every rerun is timed. AppTest swaps a process-global runtime
+on each run, so sessions can't rerun on parallel threads. Instead, users are
+spread over --processes worker processes. Each process keeps all its sessions
+alive and interleaves their reruns round-robin (the other sessions' reruns stand
+in for think time), sharing st.cache_data the way one
+server process does. DPIRD is replaced by synthetic netCDF files
+(DPIRD_THREDDS_URL) and the rainfall disk cache by a temporary directory.
+"""
+import argparse
+import os
+import pickle
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+# Must be set before the repo modules are imported
+os.environ.setdefault("SCA_PERF", "1")
+os.environ.setdefault("SCA_PERF_METRICS", os.path.join(tempfile.gettempdir(), "load_test_perf_metrics.json"))
+# Keep the shared cache, weather snapshot and assessment log built from fixture weather out of
+# the app's .cache; worker processes inherit the first process's directory
+if "SCA_LOAD_TEST_DIR" not in os.environ:
+    os.environ["SCA_LOAD_TEST_DIR"] = tempfile.mkdtemp(prefix="load_test_")
+    os.environ["SCA_SHARED_CACHE_PATH"] = os.path.join(os.environ["SCA_LOAD_TEST_DIR"], "shared_cache.sqlite3")
+    os.environ["SCA_WEATHER_SNAPSHOT"] = os.path.join(os.environ["SCA_LOAD_TEST_DIR"], "weather_snapshot.bin")
+    os.environ["SCA_ASSESSMENT_LOG_DIR"] = os.path.join(os.environ["SCA_LOAD_TEST_DIR"], "assessment_log")
+    os.environ["SCA_SNAPSHOT_REFRESH"] = "0"
+from run_benchmarks import FIXTURE_DIR, REPO_ROOT, write_weather_fixtures
+
+import perf
+import rainfall_summary
+from rainfall_summary import LONG_TERM_YEARS
+
+RERUN_TIMEOUT_SECONDS = 120
+
+
+# --- Widget sequences ---
+def _widget(elements, label):
+    return next(w for w in elements if w.label == label)
+
+
+def fungicide_user(at, rng):
+    """
+    Yield a step name after setting each widget; the caller reruns and times it.
+    """
+    yield "open"
+    for crop, stage in [(rng.choice(["Wheat", "Barley"]), "Z39"), ("Canola", rng.choice(["50% Flower", "4-leaf"]))]:
+        _widget(at.selectbox, "🌾 Select Crop Type").select(crop)
+        yield "select crop"
+        _widget(at.selectbox, "Crop Stage (Zadoks)" if crop != "Canola" else "Crop Stage").select(stage)
+        yield "select stage"
+        _widget(at.number_input, "Expected Yield (t/ha)").set_value(round(rng.uniform(1.5, 4.5), 1))
+        yield "set yield"
+        _widget(at.checkbox, "Seed Treated?").check()
+        yield "seed treated (fragment)"
+        _widget(at.slider, "Days Since Last Rain").set_value(rng.randint(0, 14))
+        yield "slider (fragment)"
+        at.button[0].click()
+        yield "evaluate (fragment)"
+
+
+def nitrogen_user(at, rng):
+    yield "open"
+    _widget(at.selectbox, "Crop Type").select(rng.choice(["Wheat", "Barley", "Canola"]))
+    yield "select crop"
+    _widget(at.number_input, "Expected Yield (t/ha)").set_value(round(rng.uniform(2, 5), 1))
+    yield "set yield"
+    _widget(at.slider, "Nitrogen Use Efficiency (NUE)").set_value(rng.choice([0.5, 0.6, 0.7]))
+    yield "set NUE"
+    _widget(at.radio, "Was there a legume crop last year?").set_value("Yes")
+    yield "legume"
+    _widget(at.radio, "Response surface product").set_value("UAN")
+    yield "surface product"
+    if rng.random() < 0.5:
+        _widget(at.radio, "Rainfall Data Input Mode").set_value("Enter Manually")
+        yield "manual rainfall"
+        _widget(at.number_input, "Jul").set_value(rng.uniform(20, 90))
+        yield "edit month"
+    at.button[0].click()
+    yield "pdf"
+
+
+SCENARIOS = {
+    "fungicide": ("pages/fungicide_decision_tool.py", fungicide_user),
+    "nitrogen": ("pages/nitrogen_budget.py", nitrogen_user),
+}
+
+
+# --- Simulation ---
+def session_state_bytes(at):
+    total = 0
+    for key in at.session_state:
+        try:
+            total += len(pickle.dumps(at.session_state[key]))
+        except Exception:
+            pass
+    return total
+
+
+def _init_worker(rainfall_cache_dir):
+    rainfall_summary.CACHE_DIR = rainfall_cache_dir
+
+
+def run_users(user_ids, pages, iterations, seed):
+    """
+    Run several users' sessions in this process, interleaving their reruns.
+    Returns per-rerun samples, each session's state size after every iteration,
+    the process RSS growth and the raw perf span samples.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rss_before = rss_mb()
+    users = []
+    for user_id in user_ids:
+        scenario = pages[user_id % len(pages)]
+        script, steps = SCENARIOS[scenario]
+        rng = random.Random(seed + user_id)
+        at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=RERUN_TIMEOUT_SECONDS)
+        users.append({"scenario": scenario, "steps": steps, "rng": rng, "at": at, "iteration": 0,
+                      "sequence": steps(at, rng), "state_sizes": []})
+
+    samples = []
+    while users:
+        for user in list(users):
+            at = user["at"]
+            step = next(user["sequence"], None)
+            if step is None:
+                user["state_sizes"].append(session_state_bytes(at))
+                user["iteration"] += 1
+                if user["iteration"] == iterations:
+                    users.remove(user)
+                    samples.append({"scenario": user["scenario"], "state_sizes": user["state_sizes"]})
+                else:
+                    user["sequence"] = user["steps"](at, user["rng"])
+                continue
+            started = time.perf_counter()
+            at.run()
+            samples.append({"scenario": user["scenario"], "step": step,
+                            "ms": (time.perf_counter() - started) * 1000, "error": bool(at.exception)})
+    return samples, rss_mb() - rss_before, perf.process_samples()
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+def prepare_fixtures():
+    today = date.today()
+    write_weather_fixtures(year=2024)  # the latest-observation URLs point at the 2024 files
+    write_weather_fixtures(year=today.year, variables=("rain_mm", "temperature_c"), end=today)
+    for year in range(today.year - LONG_TERM_YEARS, today.year):
+        write_weather_fixtures(year=year, variables=("rain_mm",))
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=2, help="Times each user replays their sequence")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes hosting the sessions")
+    parser.add_argument("--pages", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Preparing weather fixtures in {FIXTURE_DIR} ...")
+    prepare_fixtures()
+    cache_dir = os.path.join(os.environ["SCA_LOAD_TEST_DIR"], "rainfall")
+
+    processes = max(1, min(args.processes, args.users))
+    assignments = [list(range(args.users))[i::processes] for i in range(processes)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        results = list(pool.map(run_users, assignments, [args.pages] * processes, [args.iterations] * processes,
+                                [args.seed] * processes))
+    elapsed = time.perf_counter() - started
+
+    samples = [s for process_samples, _, _ in results for s in process_samples if "step" in s]
+    sessions = [s for process_samples, _, _ in results for s in process_samples if "state_sizes" in s]
+    print(f"\n{args.users} users x {args.iterations} iterations on {processes} processes: "
+          f"{len(samples)} reruns in {elapsed:.1f} s ({len(samples) / elapsed:.1f} reruns/s)")
+    print(f"{'scenario':<10} {'step':<26} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>7}")
+    groups = {}
+    for sample in samples:
+        groups.setdefault((sample["scenario"], sample["step"]), []).append(sample)
+    for (scenario, step), group in groups.items():
+        ms = [s["ms"] for s in group]
+        print(f"{scenario:<10} {step:<26} {len(ms):>5} {percentile(ms, 50):>9.1f} {percentile(ms, 95):>9.1f} "
+              f"{max(ms):>9.1f} {sum(s['error'] for s in group):>7}")
+
+    print(f"\nMemory: process RSS grew {sum(r[1] for r in results) / args.users:.1f} MB per session on average")
+    for scenario in args.pages:
+        sizes = [s["state_sizes"] for s in sessions if s["scenario"] == scenario]
+        if sizes:
+            growth = [(s[-1] - s[0]) / 1024 for s in sizes]
+            print(f"  {scenario:<10} session state {percentile([s[0] for s in sizes], 50) / 1024:.1f} KB after one "
+                  f"pass, grew {max(growth):.1f} KB max over the remaining {args.iterations - 1} passes")
+
+    if perf.ENABLED:
+        merged = {}
+        for _, _, span_samples in results:
+            for key, values in span_samples.items():
+                merged.setdefault(key, []).extend(values)
+        print("\nSpan percentiles across all sessions (perf):")
+        for row in perf.summarise(merged):
+            print(f"  {str(row['page']):<24} {row['span']:<20} n={row['count']:<5} p50 {row['p50_ms']:>8.1f} ms  "
+                  f"p90 {row['p90_ms']:>8.1f} ms  p99 {row['p99_ms']:>8.1f} ms")
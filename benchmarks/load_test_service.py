@@ -0,0 +1,111 @@
+"""
+Load test for risk_service.py on one box: concurrent clients posting batches.
+
+    python benchmarks/load_test_service.py --clients 8 --requests 50 --batch 200
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8600 --engine nitrogen
+
+Without --url a service is started in-process on a free port.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SEED_TREATMENTS = ["None", "Saltro", "ILeVO", "Jocky", "Flutriafol"]
+PRIOR_FUNGICIDES = ["None", "Prosaro", "Aviator Xpro", "Miravis Star", "Elatus Ace"]
+
+
+def sample_item(engine, rng):
+    spray = {
+        "seed_dressed": rng.random() < 0.5,
+        "prior_fungicide_applied": rng.random() < 0.5,
+        "selected_seed_treatment": rng.choice(SEED_TREATMENTS),
+        "selected_prior_fungicide": rng.choice(PRIOR_FUNGICIDES),
+    }
+    temp, rh = rng.uniform(5, 25), rng.uniform(50, 100)
+    if engine == "sclerotinia":
+        return {"temp": temp, "rh": rh, "rain": rng.uniform(0, 20), "days_since_rain": rng.randint(0, 14),
+                "leaf_wetness_hours": rng.randint(0, 50), "rain_days_last_week": rng.randint(0, 7),
+                "crop_stage": rng.choice(["10% Flower", "50% Flower", "Petal Drop"]), **spray}
+    if engine == "septoria":
+        return {"temp": temp, "rh": rh, "rainfall": rng.uniform(0, 20), "crop_stage": rng.choice(["Z30", "Z39", "Z49"]),
+                "has_resistance": rng.random() < 0.3, **spray}
+    if engine == "rust":
+        return {"temp": temp, "rh": rh, "crop_stage": rng.choice(["Z30", "Z39", "Z49"]),
+                "has_resistance": rng.random() < 0.3, **spray}
+    if engine == "blackleg":
+        return {"variety": rng.choice(["Hunter", "Emu", "4540P", "Other"]), "crop_stage": rng.choice(["2-leaf", "4-leaf"]),
+                "yield_potential": 2.5, "grain_price": 650, "fungicide_cost": 35, "application_cost": 12,
+                "rain_mm": rng.uniform(0, 10), "rh_percent": rh, "temperature_c": temp,
+                "seed_treatment": rng.choice(SEED_TREATMENTS), "prior_fungicide": rng.choice(PRIOR_FUNGICIDES)}
+    if engine == "nitrogen":
+        return {"crop": "Wheat", "yield_t_ha": rng.uniform(2, 5), "protein_or_oil": 11.5, "nitrate": rng.uniform(2, 15),
+                "ammonium": 2.0, "organic_carbon": rng.uniform(0.8, 2), "grain_price": 350}
+    raise ValueError(f"No sample generator for {engine}")
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        body = response.read()
+    if response.headers.get("Content-Type") == "application/x-ndjson":
+        return len(body.splitlines())
+    data = json.loads(body)
+    return len(data["results"]) if "results" in data else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Existing service base URL; default starts one in-process")
+    parser.add_argument("--engine", default="sclerotinia",
+                        choices=["sclerotinia", "septoria", "rust", "blackleg", "nitrogen"])
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--batch", type=int, default=200, help="Items per request")
+    parser.add_argument("--workers", type=int, default=None, help="Worker pool size for the in-process service")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        from risk_service import make_server
+        server = make_server(port=0, workers=args.workers, executor=args.executor)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rng = random.Random(42)
+    payload = {"items": [sample_item(args.engine, rng) for _ in range(args.batch)]}
+    url = f"{base_url}/v1/{args.engine}"
+    post(url, payload)  # warm the worker pool
+
+    def client(_):
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            assert post(url, payload) == args.batch
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as clients:
+        latencies = sorted(l for result in clients.map(client, range(args.clients)) for l in result)
+    elapsed = time.perf_counter() - started
+
+    total_requests = len(latencies)
+    print(f"{args.engine}: {args.clients} clients x {args.requests} requests x {args.batch} items")
+    print(f"  {total_requests / elapsed:.1f} requests/s, {total_requests * args.batch / elapsed:,.0f} items/s")
+    print(f"  latency p50 {latencies[total_requests // 2] * 1000:.1f} ms, "
+          f"p95 {latencies[int(total_requests * 0.95) - 1] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+    if server is not None:
+        server.shutdown()
+        server.RequestHandlerClass.pool.shutdown()
@@ -0,0 +1,202 @@
+"""
+Render one nitrogen budget PDF per paddock from a CSV, spread over a process pool.
+
+    python bulk_nitrogen_reports.py paddocks.csv reports/ --merged reports/all_paddocks.pdf
+
+The CSV uses the nitrogen_engine columns (crop, yield_t_ha, protein_or_oil, nitrate,
+ammonium, organic_carbon, ...) plus a paddock_id column. Monthly rainfall comes from
+Jan..Dec columns when present, otherwise from DPIRD for each row's station column
+(with --fetch-rainfall), in which case the soil N simulation runs on the station's
+observed daily weather, as on the nitrogen budget page. Stations DPIRD can't
+supply are reported without rainfall rather than stopping the run.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from nitrogen_engine import (CROP_DEFAULTS, PADDOCK_INPUT_DEFAULTS, convert_organic_c_to_n, evaluate_paddocks,
+                             soil_mineral_n, total_n_required)
+from dpird_weather_fetcher import fetch_daily_weather
+from soil_nitrogen_model import MONTHLY_MEAN_RAIN_MM, season_weather, simulate_paddocks
+from rainfall_summary import MONTHS, get_long_term_monthly_means, get_monthly_rainfall
+
+REPORT_INPUT_COLUMNS = ("crop", "yield_t_ha", "protein_or_oil", "nitrate", "ammonium", "legume_biomass",
+                        "nue", "grain_price", "urea_price", "uan_price")
+# Engine outputs quoted in the report
+REPORT_BUDGET_COLUMNS = ("organic_n", "mineralised_n", "leached_n", "legume_n", "n_total_required", "soil_n",
+                         "in_season_n", "urea_total_cost", "uan_total_cost", "urea_break_even_kg", "uan_break_even_kg")
+
+
+# --- Worker process ---
+def _init_worker():
+    # Headless backend and the shared logo/QR assets are set up once per worker, not per report
+    import matplotlib
+    matplotlib.use("Agg")
+    from nitrogen_report import load_logo, load_qr_code
+    load_logo()
+    load_qr_code()
+
+
+def _render_paddock(task):
+    from nitrogen_report import build_nitrogen_report, render_rainfall_chart
+
+    chart = None
+    if task["rain"]:
+        chart = render_rainfall_chart(list(task["rain"]), list(task["rain"].values()), task["station_code"])
+    pdf_data = build_nitrogen_report(task["inputs"], task["budget"], task["rain"], task["rain_source"],
+                                     task["station_code"], rainfall_chart=chart)
+    with open(task["path"], "wb") as f:
+        f.write(pdf_data)
+    return task["path"], chart
+
+
+# --- Batch preparation (parent process) ---
+def _safe_filename(value):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value)).strip("_") or "paddock"
+
+
+def station_season(code, year):
+    """
+    This season's monthly rainfall, its source label and the daily weather to
+    simulate the season with for one DPIRD station, built as the nitrogen budget
+    page does: observed days, then the long-term monthly means. Raises if the
+    station's rainfall can't be fetched.
+    """
+    record = get_monthly_rainfall(code, year)
+    monthly = {m: round(v, 1) for m, v in record["monthly"].items()}
+    try:
+        long_term = get_long_term_monthly_means(code, end_year=year)
+    except Exception as e:
+        print(f"No long-term rainfall for {code}, using district averages: {e}")
+        long_term = dict(MONTHLY_MEAN_RAIN_MM)
+    try:
+        observed = fetch_daily_weather(code, year)
+    except Exception as e:
+        print(f"No daily weather for {code}, using long-term averages for the soil N simulation: {e}")
+        observed = None
+    source = f"DPIRD Station Code: {code}" + (f" (to {record['through']})" if record["through"] else "")
+    return monthly, source, season_weather(year, observed=observed, monthly_rain=long_term)
+
+
+def paddock_rainfall(paddocks, year, fetch_rainfall=False):
+    """
+    Monthly rainfall per paddock as a list of {month: mm} dicts (empty when unknown)
+    and the matching rain source labels, plus the daily weather to simulate with
+    as {key: season_weather DataFrame} and each row's key (None when unknown).
+    Register rainfall is keyed per row, fetched rainfall per station.
+    """
+    if all(month in paddocks.columns for month in MONTHS):
+        rain = paddocks[MONTHS].astype(float).to_dict("records")
+        keys = [f"row_{i}" for i in range(len(paddocks))]
+        weather = {key: season_weather(year, monthly_rain=r) for key, r in zip(keys, rain)}
+        return rain, ["Rainfall from paddock register"] * len(paddocks), weather, keys
+
+    if fetch_rainfall and "station" in paddocks.columns:
+        by_station, weather = {}, {}
+        for code in paddocks["station"].dropna().unique():
+            try:
+                monthly, source, weather[code] = station_season(code, year)
+            except Exception as e:
+                print(f"No rainfall for station {code}, reporting its paddocks without it: {e}")
+                continue
+            by_station[code] = (monthly, source)
+        rain = [by_station.get(code, ({},))[0] for code in paddocks["station"]]
+        sources = [by_station.get(code, ({}, "No rainfall data"))[1] for code in paddocks["station"]]
+        keys = [code if code in weather else None for code in paddocks["station"]]
+        return rain, sources, weather, keys
+
+    return [{} for _ in range(len(paddocks))], ["No rainfall data"] * len(paddocks), {}, [None] * len(paddocks)
+
+
+def prepare_tasks(paddocks, output_dir, fetch_rainfall=False):
+    paddocks = paddocks.reset_index(drop=True)
+    for col, default in PADDOCK_INPUT_DEFAULTS.items():
+        if default is not None:
+            paddocks[col] = paddocks[col].fillna(default) if col in paddocks.columns else default
+    if "paddock_id" not in paddocks.columns:
+        paddocks["paddock_id"] = [f"paddock_{i + 1}" for i in paddocks.index]
+
+    year = pd.Timestamp.now().year
+    rain, rain_sources, weather, weather_keys = paddock_rainfall(paddocks, year, fetch_rainfall)
+
+    # Simulate mineralisation and leaching wherever this season's weather is known
+    has_weather = pd.Series([key is not None for key in weather_keys])
+    if has_weather.any():
+        simulated = paddocks[has_weather].copy()
+        simulated["station"] = [weather_keys[i] for i in simulated.index]
+        _, simulated["n_demand"] = total_n_required(simulated["yield_t_ha"], simulated["protein_or_oil"])
+        simulated["initial_mineral_n"] = soil_mineral_n(simulated["nitrate"], simulated["ammonium"])
+        simulated["organic_n"] = convert_organic_c_to_n(simulated["organic_carbon"].astype(float))
+        soil_n = simulate_paddocks(simulated, weather)
+        paddocks.loc[has_weather, "mineralised_n"] = soil_n["mineralised_n"]
+        paddocks.loc[has_weather, "leached_n"] = soil_n["leached_n"]
+
+    budgets = evaluate_paddocks(paddocks)
+
+    tasks = []
+    used_names = set()
+    for i, row in budgets.iterrows():
+        crop = row["crop"] if row["crop"] in CROP_DEFAULTS else "Wheat"
+        name = _safe_filename(row["paddock_id"])
+        while name in used_names:
+            name += "_dup"
+        used_names.add(name)
+        inputs = {col: row[col] for col in REPORT_INPUT_COLUMNS}
+        inputs.update({"crop_type": row["crop"], "quality_label": CROP_DEFAULTS[crop]["quality_label"],
+                       "ammonia": row["ammonium"]})
+        tasks.append({
+            "path": os.path.join(output_dir, f"{name}.pdf"),
+            "inputs": inputs,
+            "budget": {col: float(row[col]) for col in REPORT_BUDGET_COLUMNS},
+            "rain": rain[i],
+            "rain_source": rain_sources[i],
+            "station_code": str(row["station"]) if pd.notna(row.get("station")) else "Paddock register",
+        })
+    return tasks
+
+
+def write_merged_report(tasks, charts, path):
+    """
+    One PDF with a page per paddock, reusing the charts the workers already rendered.
+    """
+    from nitrogen_report import PDF, add_report_page
+
+    pdf = PDF()
+    for task, chart in zip(tasks, charts):
+        add_report_page(pdf, task["inputs"], task["budget"], task["rain"], task["rain_source"],
+                        task["station_code"], rainfall_chart=chart)
+    pdf.output(path)
+
+
+def run_bulk_reports(csv_path, output_dir, merged_path=None, workers=None, fetch_rainfall=False):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = prepare_tasks(pd.read_csv(csv_path), output_dir, fetch_rainfall)
+
+    charts = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        for path, chart in pool.map(_render_paddock, tasks, chunksize=chunksize):
+            charts.append(chart)
+
+    if merged_path:
+        write_merged_report(tasks, charts, merged_path)
+    return [task["path"] for task in tasks]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input_csv", help="Paddock CSV")
+    parser.add_argument("output_dir", help="Directory for the per-paddock PDFs")
+    parser.add_argument("--merged", help="Also write every paddock into this single PDF")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--fetch-rainfall", action="store_true",
+                        help="Pull monthly rainfall from DPIRD for each row's station column")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = run_bulk_reports(args.input_csv, args.output_dir, args.merged, args.workers, args.fetch_rainfall)
+    print(f"Wrote {len(paths)} reports to {args.output_dir} in {time.perf_counter() - started:.1f} s")
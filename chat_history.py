@@ -0,0 +1,112 @@
+"""
+Token-budgeted conversation history for the fungicide chat assistant.
+
+The history is a plain dict kept in st.session_state:
+    messages  every displayed message, capped at MAX_STORED_MESSAGES
+    context   the most recent turns that fit CONTEXT_TOKEN_BUDGET; sent with each request
+    summary   short notes on turns that have fallen out of the context
+"""
+from math import ceil
+from types import SimpleNamespace
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+CONTEXT_TOKEN_BUDGET = 3000     # prior turns sent with each request, excluding the system prompt
+SUMMARY_TOKEN_BUDGET = 300
+MAX_STORED_MESSAGES = 60        # per session; older messages are no longer displayed
+MESSAGE_OVERHEAD_TOKENS = 4     # role and separators per chat message
+SUMMARY_NOTE_CHARS = 160        # each dropped turn is noted by its first sentence, up to this long
+
+
+def count_tokens(text):
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # About four characters per token for English text
+    return ceil(len(text) / 4)
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def new_history(greeting=None):
+    history = {"messages": [], "context": [], "summary": [], "context_tokens": 0}
+    if greeting:
+        add_message(history, "assistant", greeting, in_context=False)
+    return history
+
+
+def _note(message):
+    first_sentence = message["content"].strip().split("\n")[0].split(". ")[0]
+    if len(first_sentence) > SUMMARY_NOTE_CHARS:
+        first_sentence = first_sentence[:SUMMARY_NOTE_CHARS - 3] + "..."
+    speaker = "User asked" if message["role"] == "user" else "Assistant said"
+    return f"{speaker}: {first_sentence}"
+
+
+def _fold_into_summary(history, message):
+    history["summary"].append(_note(message))
+    # Oldest notes go first once the summary itself is over budget
+    while len(history["summary"]) > 1 and count_tokens("\n".join(history["summary"])) > SUMMARY_TOKEN_BUDGET:
+        history["summary"].pop(0)
+
+
+def add_message(history, role, content, in_context=True):
+    """
+    Append a message for display and, unless in_context is False, to the request
+    context. Turns pushed out of the token budget are folded into the summary.
+    """
+    message = {"role": role, "content": content}
+    history["messages"].append(message)
+    del history["messages"][:-MAX_STORED_MESSAGES]
+
+    if in_context:
+        history["context"].append(message)
+        history["context_tokens"] += message_tokens(message)
+        # Always keep the latest message, even if it alone is over budget
+        while len(history["context"]) > 1 and history["context_tokens"] > CONTEXT_TOKEN_BUDGET:
+            dropped = history["context"].pop(0)
+            history["context_tokens"] -= message_tokens(dropped)
+            _fold_into_summary(history, dropped)
+    return message
+
+
+def request_messages(history, system_prompt):
+    """
+    The messages to send to the model: system prompt, summary of older turns, recent turns.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if history["summary"]:
+        messages.append({"role": "system",
+                         "content": "Earlier in this conversation:\n" + "\n".join(history["summary"])})
+    messages.extend(history["context"])
+    return messages
+
+
+# --- Offline stand-in for the OpenAI client ---
+class StubChatClient:
+    """
+    Mimics client.chat.completions.create(), including stream=True, so the page and
+    history logic can run without an API key. Replies echo the question and report
+    how much context was sent.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        self.requests.append(messages)
+        question = messages[-1]["content"]
+        tokens = sum(message_tokens(m) for m in messages)
+        content = f"(stub reply to: {question[:80]}) [{len(messages)} messages, ~{tokens} tokens of context]"
+        if stream:
+            words = content.split(" ")
+            pieces = words[:1] + [" " + word for word in words[1:]]
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                    for piece in pieces)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
@@ -0,0 +1,145 @@
+"""
+Thermal-time crop stage predictor. Accumulates degree-days (daily mean temperature
+above BASE_TEMPERATURE_C) from sowing at each paddock's station and maps them to
+the stage names the risk functions use: Zadoks codes for wheat and barley, and
+leaf and flowering stages for canola.
+
+    temperature = station_temperatures(["ESP", "RAV"], year=2025)
+    stages = predict_stages(paddocks, temperature)             # full season
+    stages = predict_stages(paddocks, temperature, previous=stages)  # next day, new days only
+
+paddocks needs crop, station and sowing_date columns, plus an optional maturity
+column (early, mid or late; default mid, see VARIETY_MATURITY). The stage thresholds are indicative WA
+values for a mid-maturity variety and should be calibrated against local
+phenology observations.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dpird_weather_fetcher import fetch_daily_weather
+
+BASE_TEMPERATURE_C = 0.0
+# Recent days averaged to estimate when the next stage will be reached
+RECENT_DAYS = 7
+PRE_EMERGENCE_STAGE = "Sown"
+FETCH_THREADS = 8
+
+# Degree-days from sowing at which each stage starts, for a mid-maturity variety
+STAGE_THERMAL_TIME = {
+    "Wheat": [("Z10", 150), ("Z21", 450), ("Z30", 800), ("Z39", 1050), ("Z49", 1180), ("Z65", 1400)],
+    "Barley": [("Z10", 140), ("Z21", 420), ("Z30", 750), ("Z39", 980), ("Z49", 1080), ("Z65", 1300)],
+    "Canola": [("Cotyledon", 130), ("2-leaf", 250), ("3-leaf", 320), ("4-leaf", 390), ("6-leaf", 530),
+               ("10% Flower", 1050), ("50% Flower", 1200), ("Petal Drop", 1450)],
+}
+MATURITY_FACTORS = {"early": 0.9, "mid": 1.0, "late": 1.1}
+# Indicative maturity class of the varieties offered on the decision page; others are mid
+VARIETY_MATURITY = {
+    "Hunter": "early", "Emu": "late", "4540P": "mid", "4520P": "early",
+    "Scepter": "mid", "Vixen": "early",
+    "La Trobe": "early", "RGT Planet": "late",
+}
+
+
+def station_temperatures(codes, year=None, start=None):
+    """
+    Daily mean temperature for each station as a DataFrame, one column per code.
+    """
+    codes = list(dict.fromkeys(codes))
+
+    def fetch(code):
+        return fetch_daily_weather(code, year, start=start, variables=("temperature_c",))["temperature_c"]
+
+    with ThreadPoolExecutor(max_workers=FETCH_THREADS) as pool:
+        series = list(pool.map(fetch, codes))
+    return pd.DataFrame(dict(zip(codes, series))).sort_index()
+
+
+def daily_thermal_time(temperature, base=BASE_TEMPERATURE_C):
+    """
+    Degree-days per day and station; gaps take the previous day's temperature.
+    """
+    return (temperature.ffill() - base).clip(lower=0).fillna(0.0)
+
+
+def thermal_time_between(temperature, stations, start_dates, end_date):
+    """
+    Degree-days accumulated at each paddock's station from its start date to
+    end_date, both inclusive. NaN for stations missing from temperature.
+    """
+    daily = daily_thermal_time(temperature.loc[:pd.Timestamp(end_date)])
+    cumulative = np.vstack([np.zeros(daily.shape[1]), daily.to_numpy().cumsum(axis=0)])
+    columns = daily.columns.get_indexer(pd.Index(stations))
+    start_rows = daily.index.searchsorted(pd.to_datetime(pd.Series(start_dates)).dt.normalize().to_numpy())
+    accumulated = cumulative[len(daily), columns] - cumulative[np.minimum(start_rows, len(daily)), columns]
+    return np.where(columns >= 0, accumulated, np.nan)
+
+
+def assign_stages(crops, maturities, thermal_time):
+    """
+    Current stage, next stage and degree-days still needed to reach it, per paddock.
+    """
+    thermal_time = np.asarray(thermal_time, dtype=float)
+    n = len(thermal_time)
+    current = np.full(n, None, dtype=object)
+    upcoming = np.full(n, None, dtype=object)
+    to_next = np.full(n, np.nan)
+
+    groups = pd.DataFrame({"crop": list(crops), "maturity": list(maturities)}).groupby(["crop", "maturity"]).indices
+    for (crop, maturity), positions in groups.items():
+        table = STAGE_THERMAL_TIME.get(crop)
+        if table is None:
+            continue
+        names = np.array([PRE_EMERGENCE_STAGE] + [stage for stage, _ in table] + [None], dtype=object)
+        thresholds = np.array([dd for _, dd in table]) * MATURITY_FACTORS.get(str(maturity).lower(), 1.0)
+        tt = thermal_time[positions]
+        known = ~np.isnan(tt)
+        reached = np.searchsorted(thresholds, np.where(known, tt, 0.0), side="right")
+        current[positions] = np.where(known, names[reached], None)
+        upcoming[positions] = np.where(known, names[reached + 1], None)
+        remaining = thresholds[np.minimum(reached, len(thresholds) - 1)] - tt
+        to_next[positions] = np.where(known & (reached < len(thresholds)), remaining, np.nan)
+    return current, upcoming, to_next
+
+
+def predict_stages(paddocks, temperature, as_of=None, previous=None):
+    """
+    Predict each paddock's stage at as_of (default: the last day in temperature).
+    Pass the previous result as previous to only accumulate the days since its
+    through date. Returns a DataFrame aligned with paddocks with thermal_time,
+    crop_stage, next_stage, degree_days_to_next, next_stage_date and through.
+    """
+    as_of = pd.Timestamp(as_of or temperature.index.max()).normalize()
+    sowing = pd.to_datetime(paddocks["sowing_date"]).dt.normalize()
+    maturity = paddocks["maturity"].fillna("mid") if "maturity" in paddocks.columns \
+        else pd.Series("mid", index=paddocks.index)
+
+    if previous is None:
+        start, carried = sowing, 0.0
+    else:
+        through = pd.to_datetime(previous["through"].reindex(paddocks.index))
+        day_after = through + pd.Timedelta(days=1)
+        start = day_after.where(day_after > sowing, sowing).fillna(sowing)
+        carried = previous["thermal_time"].reindex(paddocks.index).fillna(0.0).to_numpy()
+    thermal_time = carried + thermal_time_between(temperature, paddocks["station"], start, as_of)
+    not_sown = sowing.to_numpy() > as_of
+    thermal_time = np.where(not_sown, 0.0, thermal_time)
+
+    current, upcoming, to_next = assign_stages(paddocks["crop"], maturity, thermal_time)
+
+    recent = daily_thermal_time(temperature.loc[:as_of]).tail(RECENT_DAYS).mean()
+    rate = recent.reindex(pd.Index(paddocks["station"])).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days = np.ceil(to_next / rate)
+    next_date = as_of + pd.to_timedelta(np.where(np.isfinite(days) & ~not_sown, days, np.nan), unit="D")
+
+    # thermal_time is left unrounded so daily updates don't accumulate rounding error
+    return pd.DataFrame({
+        "thermal_time": thermal_time,
+        "crop_stage": current,
+        "next_stage": upcoming,
+        "degree_days_to_next": np.round(to_next, 1),
+        "next_stage_date": next_date,
+        "through": as_of,
+    }, index=paddocks.index)
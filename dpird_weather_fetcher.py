@@ -1,28 +1,50 @@
 
-import xarray as xr
 import pandas as pd
 import os
 from datetime import datetime, timedelta
+from functools import lru_cache
 
-# Load station metadata with lat/lon using an absolute path
+# Station metadata with lat/lon using an absolute path. The table and xarray are
+# loaded on first use so importing this module stays cheap on page cold-start.
 station_file = os.path.join(os.path.dirname(__file__), "dpird_stations.csv")
-station_df = pd.read_csv(station_file)
 
-# URLs to DPIRD OpenDAP datasets
-RAIN_URL = "https://weather.dpird.wa.gov.au/thredds/dodsC/IDW60900.2024_Rainfall.nc"
-TEMP_URL = "https://weather.dpird.wa.gov.au/thredds/dodsC/IDW60901.2024_Temp.nc"
-RH_URL = "https://weather.dpird.wa.gov.au/thredds/dodsC/IDW60902.2024_RH.nc"
+@lru_cache(maxsize=1)
+def load_station_table():
+    return pd.read_csv(station_file)
+
+def __getattr__(name):
+    # Keeps `from dpird_weather_fetcher import station_df` working without loading at import time
+    if name == "station_df":
+        return load_station_table()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# URLs to DPIRD OpenDAP datasets. Set DPIRD_THREDDS_URL to a local directory of
+# netCDF files (e.g. the benchmark fixtures) to run without the DPIRD server.
+DPIRD_URL = "https://weather.dpird.wa.gov.au/thredds/dodsC"
+THREDDS_URL = os.environ.get("DPIRD_THREDDS_URL", DPIRD_URL)
+RAIN_URL = f"{THREDDS_URL}/IDW60900.2024_Rainfall.nc"
+TEMP_URL = f"{THREDDS_URL}/IDW60901.2024_Temp.nc"
+RH_URL = f"{THREDDS_URL}/IDW60902.2024_RH.nc"
+
+# Yearly datasets for daily series, e.g. DAILY_URLS["rain_mm"].format(year=2025)
+DAILY_URLS = {
+    "rain_mm": (THREDDS_URL + "/IDW60900.{year}_Rainfall.nc", "rain_day"),
+    "temperature_c": (THREDDS_URL + "/IDW60901.{year}_Temp.nc", "temp_mean"),
+    "rh_percent": (THREDDS_URL + "/IDW60902.{year}_RH.nc", "rh_mean"),
+}
 
 def find_station_location(code):
+    station_df = load_station_table()
     row = station_df[station_df['code'] == code]
     if row.empty:
         raise ValueError(f"Station code {code} not found.")
     return float(row.iloc[0]['lat']), float(row.iloc[0]['lon'])
 
 def fetch_variable_at_station(url, lat, lon, variable):
+    import xarray as xr
     ds = xr.open_dataset(url)
-    lat_idx = abs(ds['lat'] - lat).argmin()
-    lon_idx = abs(ds['lon'] - lon).argmin()
+    lat_idx = int(abs(ds['lat'] - lat).argmin('lat'))
+    lon_idx = int(abs(ds['lon'] - lon).argmin('lon'))
     last_valid = ds[variable].isel(lat=lat_idx, lon=lon_idx).dropna("time")[-1].values.item()
     return round(float(last_valid), 1)
 
@@ -46,3 +68,82 @@ def fetch_weather_from_dpird_live(code):
             "rh_percent": 0.0,
             "error": str(e)
         }
+
+def fetch_series_at_station(url, lat, lon, variable, start=None):
+    import xarray as xr
+    ds = xr.open_dataset(url)
+    lat_idx = int(abs(ds['lat'] - lat).argmin('lat'))
+    lon_idx = int(abs(ds['lon'] - lon).argmin('lon'))
+    series = ds[variable].isel(lat=lat_idx, lon=lon_idx)
+    if start is not None:
+        series = series.sel(time=slice(pd.Timestamp(start), None))
+    return series.dropna("time").to_series().astype(float)
+
+def _snapshot_latest(snapshot, code):
+    # The snapshot's last observation of each variable, dated by the oldest of them
+    if snapshot is None or code not in snapshot.stations:
+        return None
+    latest = {name: snapshot.latest(code, name) for name in ("rain_mm", "temperature_c", "rh_percent")}
+    if any(value is None for _, value in latest.values()):
+        return None
+    saved = {name: round(value, 1) for name, (_, value) in latest.items()}
+    saved["observed_date"] = min(day for day, _ in latest.values()).isoformat()
+    return saved
+
+def fetch_latest_weather(code, max_age_hours=None):
+    """
+    A station's latest observations. While the offline snapshot is newer than
+    max_age_hours (default REFRESH_AFTER_HOURS, which the background refresh keeps
+    it within) they are read straight from it, so a page never waits on DPIRD;
+    otherwise fetch_weather_from_dpird_live, falling back to the snapshot when
+    DPIRD can't be reached. Snapshot readings carry the date they were observed
+    as "observed_date", and also as "snapshot_date" when they stand in for a
+    failed live fetch.
+    """
+    from weather_snapshot import REFRESH_AFTER_HOURS, open_snapshot
+    snapshot = open_snapshot(source=THREDDS_URL)
+    max_age_hours = REFRESH_AFTER_HOURS if max_age_hours is None else max_age_hours
+    if snapshot is not None and snapshot.age_hours() < max_age_hours:
+        saved = _snapshot_latest(snapshot, code)
+        if saved is not None:
+            return saved
+    weather = fetch_weather_from_dpird_live(code)
+    if "error" not in weather:
+        return weather
+    saved = _snapshot_latest(snapshot, code)
+    if saved is None:
+        return weather
+    saved["snapshot_date"] = saved["observed_date"]
+    return saved
+
+def fetch_daily_weather(code, year=None, start=None, variables=("rain_mm", "temperature_c")):
+    """
+    Daily station series for one calendar year as a DataFrame indexed by date.
+    Pass start to only pull days on or after that date. Days held in the offline
+    snapshot are read from it, and only later days from DPIRD; if DPIRD can't be
+    reached the snapshot's days are returned on their own.
+    """
+    year = year or datetime.now().year
+    from weather_snapshot import open_snapshot
+    snapshot = open_snapshot(source=THREDDS_URL)
+    saved, live_from = snapshot.daily(code, year, start, variables) if snapshot else (None, None)
+    if saved is not None and live_from is None:
+        return saved
+    try:
+        live = fetch_daily_weather_live(code, year, live_from or start, variables)
+    except Exception:
+        if saved is None:
+            raise
+        return saved
+    return live if saved is None else pd.concat([saved, live])
+
+def fetch_daily_weather_live(code, year, start=None, variables=("rain_mm", "temperature_c")):
+    lat, lon = find_station_location(code)
+    columns = {}
+    for name in variables:
+        url, variable = DAILY_URLS[name]
+        columns[name] = fetch_series_at_station(url.format(year=year), lat, lon, variable, start)
+    daily = pd.DataFrame(columns)
+    daily.index = pd.DatetimeIndex(daily.index).normalize()
+    daily.index.name = "date"
+    return daily
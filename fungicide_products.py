@@ -0,0 +1,100 @@
+"""
+Fungicide product reference data and the ROI comparison table shown on the
+fungicide decision page.
+"""
+
+seed_treatment_lookup = {
+    "None": {"group": "", "moa": ""},
+    "Saltro": {"group": "Group 7", "moa": "SDHI"},
+    "ILeVO": {"group": "Group 7", "moa": "SDHI"},
+    "Flutriafol": {"group": "Group 3", "moa": "DMI"},
+    "Jocky": {"group": "Group 3", "moa": "DMI"},
+    "Vibrance": {"group": "Group 7", "moa": "SDHI"},
+    "EverGol Extend": {"group": "Group 7", "moa": "SDHI"},
+    "EverGol Energy": {"group": "Group 7", "moa": "SDHI"},
+}
+
+foliar_fungicide_lookup = {
+    "None": {"group": "", "moa": ""},
+    "Prothio T": {"group": "Group 3", "moa": "DMI"},
+    "Aviator Xpro": {"group": "Group 3+11", "moa": "DMI + QoI"},
+    "Miravis Star": {"group": "Group 3+7", "moa": "DMI + SDHI"},
+    "Elatus Ace": {"group": "Group 7+11", "moa": "SDHI + QoI"},
+    "Miravis": {"group": "Group 7", "moa": "SDHI"},
+    "Azoxy Xtra": {"group": "Group 11 + 3", "moa": "DMI + QoI"},
+    "Epoxiconazole": {"group": "Group 3", "moa": "DMI"},
+    "Veritas Opti": {"group": "Group 3 + 11 + 29", "moa": "DMI + QoI"},
+}
+
+fungicide_costs = {
+    "Prosaro": {"cost_per_ha": 35, "rate": "150 mL/ha", "action": "Curative + Protective"},
+    "Aviator Xpro": {"cost_per_ha": 38, "rate": "300 mL/ha", "action": "Curative + Protective"},
+    "Miravis Star": {"cost_per_ha": 42, "rate": "500 mL/ha", "action": "Protective"},
+    "Elatus Ace": {"cost_per_ha": 40, "rate": "300 mL/ha", "action": "Protective"},
+    "Miravis": {"cost_per_ha": 36, "rate": "200 mL/ha", "action": "Protective"},
+    "Azoxy Xtra": {"cost_per_ha": 33, "rate": "300 mL/ha", "action": "Curative + Protective"},
+    "Epoxiconazole": {"cost_per_ha": 28, "rate": "250 mL/ha", "action": "Curative"},
+    "Veritas Opti": {"cost_per_ha": 48, "rate": "750 mL/ha", "action": "Protective"},
+}
+
+# Rain-free hours needed after application (indicative label values)
+DEFAULT_RAINFAST_HOURS = 2
+rainfast_hours = {
+    "Prosaro": 1,
+    "Aviator Xpro": 1,
+    "Miravis Star": 1,
+    "Elatus Ace": 1,
+    "Miravis": 1,
+    "Azoxy Xtra": 2,
+    "Epoxiconazole": 2,
+    "Veritas Opti": 1,
+    "Tilt": 2,
+    "Opera": 1,
+}
+
+
+def count_sdhi_uses(seed_treatment, prior_fungicide):
+    seed_sdhi = "sdhi" in seed_treatment_lookup.get(seed_treatment, {}).get("moa", "").lower()
+    foliar_sdhi = "sdhi" in foliar_fungicide_lookup.get(prior_fungicide, {}).get("moa", "").lower()
+    return int(seed_sdhi) + int(foliar_sdhi)
+
+
+def fungicide_roi_table(fungicide_options, grain_price, application_cost, disease_present=False):
+    """
+    One display row per fungicide option with its rate, mode of action, cost and
+    break-even yield. Only curative products are kept when disease is already present.
+    """
+    if disease_present:
+        fungicide_options = [
+            f for f in fungicide_options
+            if "curative" in fungicide_costs.get(f["name"], {}).get("action", "").lower()
+        ]
+
+    table = []
+    for f in fungicide_options:
+        name = f['name']
+        group = f['group']
+        persistence = f['persistence']
+
+        if name in fungicide_costs:
+            rate = fungicide_costs[name]["rate"]
+            cost = fungicide_costs[name]["cost_per_ha"]
+            action = fungicide_costs[name]["action"]
+            total_cost = cost + application_cost
+            be_yield = total_cost / (grain_price / 1000)
+        else:
+            rate = "-"
+            action = "-"
+            total_cost = 0
+            be_yield = "N/A"
+
+        table.append({
+            "Fungicide": name,
+            "Group": group,
+            "Persistence": persistence,
+            "Rate": rate,
+            "Mode of Action": action,
+            "Cost/ha ($)": f"${total_cost:.2f}",
+            "Break-even Yield (kg/ha)": be_yield if isinstance(be_yield, str) else f"{be_yield:.1f}"
+        })
+    return table
@@ -0,0 +1,192 @@
+"""
+Leaf wetness and sclerotinia infection index from hourly station weather.
+
+    python leaf_wetness.py hourly.csv infection_index.csv
+
+The hourly file has one row per station and hour with station, time,
+temperature_c, rh_percent and rain_mm columns (.csv or .parquet), e.g. station
+logger exports or the spray-window forecast. It is read and processed in chunks,
+carrying each station's wetness state across chunk boundaries, so a season of
+hourly records for every station runs in seconds without loading it all at once.
+
+A leaf turns wet with rain, RH at or above RH_WET, or a dew-point depression below
+DPD_ONSET_C, and stays wet until the dew-point depression rises above DPD_DRY_C
+with no rain (the dew-point depression model of Gillespie et al. 1993).
+Wet hours count towards infection once the wet spell has lasted
+MIN_WET_SPELL_HOURS, weighted by how favourable the temperature is for ascospore
+infection. A day's infection index is those weighted hours over
+FULL_INFECTION_HOURS, capped at 1.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+HOURLY_COLUMNS = ["station", "time", "temperature_c", "rh_percent", "rain_mm"]
+RAIN_WET_MM = 0.2
+RH_WET = 90
+DPD_ONSET_C = 2.0
+DPD_DRY_C = 3.8
+# Ascospores need a sustained wet period before they can infect
+MIN_WET_SPELL_HOURS = 8
+# Temperature (°C) -> weight for an infection-favourable wet hour, linear in between
+INFECTION_TEMPERATURE_C = [7, 15, 25, 30]
+INFECTION_WEIGHT = [0.0, 1.0, 1.0, 0.0]
+# Weighted wet hours in a day that make for the highest infection index
+FULL_INFECTION_HOURS = 16
+# Days of wet hours summed for the sclerotinia leaf_wetness_hours input, as on the decision page
+RECENT_DAYS = 7
+CHUNK_ROWS = 500_000
+
+
+def dew_point_c(temp, rh):
+    """
+    Dew point from air temperature and RH (Magnus formula).
+    """
+    temp = np.asarray(temp, dtype=float)
+    gamma = np.log(np.clip(np.asarray(rh, dtype=float), 1, 100) / 100) + 17.62 * temp / (243.12 + temp)
+    return 243.12 * gamma / (17.62 - gamma)
+
+
+def iter_hourly(path, chunk_rows=CHUNK_ROWS):
+    """
+    The hourly file in chunks of about chunk_rows rows, each with time parsed.
+    Rows must be in time order within each station.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(chunk_rows, columns=HOURLY_COLUMNS))
+    else:
+        batches = pd.read_csv(path, usecols=HOURLY_COLUMNS, chunksize=chunk_rows)
+    for chunk in batches:
+        chunk["time"] = pd.to_datetime(chunk["time"])
+        yield chunk
+
+
+def infection_days(hourly, state=None, final=True):
+    """
+    Daily wet_hours, infection_hours (temperature-weighted) and infection_index
+    per station from a chunk of hourly rows, and the state to pass with the next
+    chunk. Unless final, each station's last day is held back in the state until
+    a later chunk completes it.
+    """
+    state = dict(state or {})
+    hourly = hourly.sort_values(["station", "time"], kind="stable").reset_index(drop=True)
+    n = len(hourly)
+    if not n:
+        return _empty_days(), state
+    station = hourly["station"].to_numpy()
+    times = hourly["time"].to_numpy()
+    temp = hourly["temperature_c"].to_numpy(dtype=float)
+    rain = hourly["rain_mm"].fillna(0).to_numpy(dtype=float)
+    dpd = temp - dew_point_c(temp, hourly["rh_percent"])
+    position = np.arange(n)
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = station[1:] != station[:-1]
+    gap = np.ones(n, dtype=bool)            # no hour just before this one
+    gap[1:] = times[1:] - times[:-1] != np.timedelta64(1, "h")
+    gap[first] = [times[i] - np.datetime64(state[s]["last_time"]) != np.timedelta64(1, "h")
+                  if s in state else True for i, s in zip(position[first], station[first])]
+    carried = {s: state[s] for s in station[first] if s in state}
+
+    # Wet state with hysteresis: the last onset or dry-off event decides it; a gap in
+    # the series counts as drying off, and a station's first row continues its carried state
+    onset = (rain >= RAIN_WET_MM) | (hourly["rh_percent"].to_numpy(dtype=float) >= RH_WET) | (dpd < DPD_ONSET_C)
+    dry = ~onset & ((dpd > DPD_DRY_C) | gap)
+    event = np.where(onset, 1.0, np.where(dry, 0.0, np.nan))
+    start_wet = np.array([not g and carried.get(s, {}).get("wet", False) for s, g in zip(station[first], gap[first])])
+    event[first] = np.where(np.isnan(event[first]), start_wet, event[first])
+    last_event = np.maximum.accumulate(np.where(np.isnan(event), 0, position))
+    wet = event[last_event] == 1.0
+
+    # Hours into the current wet spell, continuing a spell carried from the previous chunk
+    spell_start = wet & (first | gap | ~np.roll(wet, 1))
+    carried_hours = np.zeros(n)
+    continuing = position[first][start_wet & wet[first]]
+    carried_hours[continuing] = [carried[s]["spell_hours"] for s in station[continuing]]
+    last_start = np.maximum.accumulate(np.where(spell_start, position, 0))
+    spell_hours = np.where(wet, position - last_start + 1 + carried_hours[last_start], 0)
+
+    weight = np.interp(temp, INFECTION_TEMPERATURE_C, INFECTION_WEIGHT, left=0.0, right=0.0)
+    favourable = np.where(wet & (spell_hours >= MIN_WET_SPELL_HOURS), weight, 0.0)
+
+    days = pd.DataFrame({
+        "station": station,
+        "date": hourly["time"].dt.normalize(),
+        "wet_hours": wet.astype(float),
+        "infection_hours": favourable,
+        "hours": 1,
+    }).groupby(["station", "date"], sort=False).sum().reset_index()
+
+    # Fold in the part-days held back from the previous chunk
+    held = pd.DataFrame([s["partial"] for s in state.values() if s.get("partial")])
+    if not held.empty:
+        held["date"] = pd.to_datetime(held["date"])
+        days = pd.concat([held, days]).groupby(["station", "date"], sort=False).sum().reset_index()
+        state = {s: {**carried_state, "partial": None} for s, carried_state in state.items()}
+
+    last_rows = position[np.r_[first[1:], True]]
+    for i in last_rows:
+        state[station[i]] = {"wet": bool(wet[i]), "spell_hours": int(spell_hours[i]),
+                             "last_time": str(times[i]), "partial": None}
+    if not final:
+        last_day = days.groupby("station")["date"].transform("max") == days["date"]
+        for row in days[last_day].to_dict("records"):
+            state[row["station"]]["partial"] = {**row, "date": row["date"].isoformat()}
+        days = days[~last_day]
+
+    return _finish_days(days), state
+
+
+def _finish_days(days):
+    days = days.assign(infection_hours=days["infection_hours"].round(1))
+    days["infection_index"] = np.minimum(days["infection_hours"] / FULL_INFECTION_HOURS, 1.0).round(2)
+    return days.sort_values(["station", "date"]).reset_index(drop=True)
+
+
+def _empty_days():
+    return pd.DataFrame(columns=["station", "date", "wet_hours", "infection_hours", "hours", "infection_index"])
+
+
+def stream_infection_days(chunks):
+    """
+    Daily infection index for a stream of hourly chunks, yielding each day once
+    it is complete.
+    """
+    state = {}
+    for chunk in chunks:
+        days, state = infection_days(chunk, state, final=False)
+        if len(days):
+            yield days
+    held = [s["partial"] for s in state.values() if s.get("partial")]
+    if held:
+        yield _finish_days(pd.DataFrame(held).assign(date=lambda d: pd.to_datetime(d["date"])))
+
+
+def recent_wet_hours(days, as_of=None, recent_days=RECENT_DAYS):
+    """
+    {station: wet hours over the recent_days days to as_of (default: each
+    station's last day)}, the leaf_wetness_hours assess_sclerotinia_risk expects.
+    """
+    last = days.groupby("station")["date"].transform("max") if as_of is None \
+        else pd.Timestamp(as_of).normalize()
+    recent = days[(days["date"] <= last) & (days["date"] > last - pd.Timedelta(days=recent_days))]
+    return recent.groupby("station")["wet_hours"].sum().to_dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("hourly", help="Hourly station weather (.csv or .parquet)")
+    parser.add_argument("output", help="Daily infection index to write (.csv or .parquet)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Hourly rows processed at a time")
+    args = parser.parse_args()
+
+    from morning_risk_report import write_table
+
+    started = time.perf_counter()
+    days = pd.concat(stream_infection_days(iter_hourly(args.hourly, args.chunk_rows)), ignore_index=True)
+    write_table(days, args.output)
+    print(f"{len(days):,} station-days ({days['hours'].sum():,} hours) in {time.perf_counter() - started:.1f} s "
+          f"-> {args.output}")
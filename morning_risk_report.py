@@ -0,0 +1,232 @@
+"""
+Morning disease risk action list for a whole client base.
+
+    python morning_risk_report.py register.csv action_list.csv
+    python morning_risk_report.py register.parquet action_list.parquet --workers 8
+
+The register needs paddock_id, crop, crop_stage and station columns; see
+paddock_scoring.REGISTER_DEFAULTS for the optional ones (variety, spray history,
+yield, prices). Paddocks with lat and lon but no station code are given their
+nearest station within MAX_STATION_DISTANCE_KM. With --interpolate, paddocks with
+coordinates get weather interpolated from the surrounding grid cells instead.
+Paddocks with a sowing_date but no crop_stage get the stage predicted from
+thermal time at their station (crop_stage_model). With --forecast, an hourly
+forecast sets each paddock's hours until rain, so the AFREN checks can warn when
+a spray would not be rain-fast (see spray_windows.py). With --hourly, hourly
+station weather sets leaf_wetness_hours from the leaf wetness model over the
+last week (leaf_wetness.py). rain_mm, temperature_c and rh_percent columns, where
+filled in, override the station weather for that paddock. Weather is pulled once per unique
+station, paddocks are scored in chunks across a process pool, and the action list
+is written highest risk and highest return first.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from crop_stage_model import predict_stages, station_temperatures
+from dpird_weather_fetcher import fetch_weather_from_dpird_live
+from leaf_wetness import iter_hourly, recent_wet_hours, stream_infection_days
+from paddock_registry import assign_stations
+from paddock_scoring import prepare_register, score_rows, sort_action_list
+from spray_windows import load_forecast, rain_forecast_hours
+from weather_interpolation import interpolate_latest_weather
+
+WEATHER_COLUMNS = ("rain_mm", "temperature_c", "rh_percent")
+# Paddocks per worker task; scoring a row takes microseconds, so small chunks are all overhead
+CHUNK_SIZE = 500
+# Concurrent station downloads; each one is three OPeNDAP requests
+FETCH_THREADS = 8
+# Beyond this a station's weather says little about the paddock
+MAX_STATION_DISTANCE_KM = 75
+
+
+def read_table(path):
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def write_table(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def fetch_station_weather(codes, fetch=fetch_weather_from_dpird_live):
+    """
+    Latest weather for each station code, downloaded concurrently. Returns
+    {code: {rain_mm, temperature_c, rh_percent}} and {code: error} for failures.
+    """
+    weather, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=FETCH_THREADS) as pool:
+        futures = {pool.submit(fetch, code): code for code in codes}
+        for future in as_completed(futures):
+            code, result = futures[future], future.result()
+            if "error" in result:
+                errors[code] = result["error"]
+            else:
+                weather[code] = result
+    return weather, errors
+
+
+def fill_stations_from_coordinates(register, max_distance_km=MAX_STATION_DISTANCE_KM):
+    """
+    Give paddocks with coordinates but no station code their nearest station.
+    """
+    if not {"lat", "lon"} <= set(register.columns):
+        return register
+    register = register.copy()
+    if "station" not in register.columns:
+        register["station"] = None
+    needs_station = register["station"].isna() & register["lat"].notna() & register["lon"].notna()
+    if needs_station.any():
+        nearest = assign_stations(register.loc[needs_station, ["lat", "lon"]], max_distance_km)
+        register.loc[needs_station, "station"] = nearest["station"]
+    return register
+
+
+def fill_crop_stages(register, as_of=None):
+    """
+    Predict crop_stage from sowing_date for paddocks that leave it blank.
+    """
+    if "sowing_date" not in register.columns:
+        return register
+    register = register.copy()
+    if "crop_stage" not in register.columns:
+        register["crop_stage"] = None
+    needs_stage = register["crop_stage"].isna() & register["sowing_date"].notna() & register["station"].notna()
+    if needs_stage.any():
+        paddocks = register.loc[needs_stage]
+        as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+        sowing_year = pd.to_datetime(paddocks["sowing_date"]).dt.year.min()
+        temperature = pd.concat([station_temperatures(paddocks["station"], year)
+                                 for year in range(sowing_year, as_of.year + 1)]).sort_index()
+        register.loc[needs_stage, "crop_stage"] = predict_stages(paddocks, temperature, as_of)["crop_stage"]
+    return register
+
+
+def attach_weather(register, station_weather):
+    """
+    Fill the weather columns from station_weather wherever the register leaves them blank.
+    """
+    register = register.copy()
+    for col in WEATHER_COLUMNS:
+        from_station = register["station"].map({code: w[col] for code, w in station_weather.items()})
+        register[col] = register[col].fillna(from_station) if col in register.columns else from_station
+    return register
+
+
+def attach_interpolated_weather(register):
+    """
+    Fill blank weather columns for paddocks with coordinates by IDW from the grid.
+    """
+    if not {"lat", "lon"} <= set(register.columns):
+        return register
+    register = register.copy()
+    for col in WEATHER_COLUMNS:
+        if col not in register.columns:
+            register[col] = float("nan")
+    needs_weather = register[list(WEATHER_COLUMNS)].isna().any(axis=1) & register["lat"].notna() \
+        & register["lon"].notna()
+    if needs_weather.any():
+        rows = register.loc[needs_weather]
+        interpolated = interpolate_latest_weather(rows["lat"].to_numpy(), rows["lon"].to_numpy())
+        interpolated.index = rows.index
+        for col in WEATHER_COLUMNS:
+            register.loc[needs_weather, col] = register.loc[needs_weather, col].fillna(interpolated[col])
+    return register
+
+
+def score_register(register, workers=None, progress=None):
+    """
+    Score every register row on a process pool, yielding each chunk's rows as soon
+    as it finishes. Rows with no weather come back as "Unknown" risk.
+    """
+    has_weather = register[list(WEATHER_COLUMNS)].notna().all(axis=1)
+    if not has_weather.all():
+        unscored = register.loc[~has_weather, ["paddock_id", "crop", "crop_stage", "station"]]
+        yield unscored.assign(risk_level="Unknown", recommendation="Weather unavailable for station").to_dict("records")
+
+    rows = register[has_weather].to_dict("records")
+    chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    if len(chunks) <= 1 or workers == 1:
+        # Not worth starting a pool for a single chunk
+        for chunk in chunks:
+            yield score_rows(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        done = 0
+        for future in as_completed([pool.submit(score_rows, chunk) for chunk in chunks]):
+            scored = future.result()
+            done += len(scored)
+            if progress:
+                progress(done, len(rows))
+            yield scored
+
+
+def fill_from_stations(register, column, by_station):
+    """
+    Set column from a {station: value} dict where the register leaves it empty.
+    """
+    values = register["station"].map(by_station)
+    register[column] = register[column].fillna(values) if column in register.columns else values
+    return register
+
+
+def load_scoring_register(register_path, fetch=fetch_weather_from_dpird_live, interpolate=False, forecast_path=None,
+                          hourly_path=None):
+    """
+    Read a register and fill in stations, crop stages, defaults and weather, ready to score.
+    """
+    register = fill_stations_from_coordinates(read_table(register_path))
+    if forecast_path:
+        register = fill_from_stations(register, "rain_forecast_hours", rain_forecast_hours(load_forecast(forecast_path)))
+    if hourly_path:
+        days = pd.concat(stream_infection_days(iter_hourly(hourly_path)), ignore_index=True)
+        register = fill_from_stations(register, "leaf_wetness_hours", recent_wet_hours(days))
+    register = prepare_register(fill_crop_stages(register))
+    if interpolate:
+        register = attach_interpolated_weather(register)
+
+    needs_station = register.index if not all(c in register.columns for c in WEATHER_COLUMNS) \
+        else register.index[register[list(WEATHER_COLUMNS)].isna().any(axis=1)]
+    codes = register.loc[needs_station, "station"].dropna().unique()
+    station_weather, errors = fetch_station_weather(codes, fetch)
+    for code, error in errors.items():
+        print(f"Weather unavailable for {code}: {error}")
+    return attach_weather(register, station_weather)
+
+
+def run_morning_report(register_path, output_path, workers=None, fetch=fetch_weather_from_dpird_live,
+                       interpolate=False, forecast_path=None, hourly_path=None):
+    register = load_scoring_register(register_path, fetch, interpolate, forecast_path, hourly_path)
+
+    def progress(done, total):
+        print(f"  scored {done:,}/{total:,} paddocks", end="\r")
+
+    scored = [row for chunk in score_register(register, workers, progress) for row in chunk]
+    print()
+    action_list = sort_action_list(scored)
+    write_table(action_list, output_path)
+    return action_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("register", help="Paddock register (.csv or .parquet)")
+    parser.add_argument("output", help="Action list to write (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--interpolate", action="store_true",
+                        help="Interpolate weather at paddock coordinates from the DPIRD grid")
+    parser.add_argument("--forecast", help="Hourly forecast per station, for rain-fastness warnings")
+    parser.add_argument("--hourly", help="Hourly station weather, for modelled leaf wetness hours")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    action_list = run_morning_report(args.register, args.output, args.workers, interpolate=args.interpolate,
+                                     forecast_path=args.forecast, hourly_path=args.hourly)
+    counts = action_list["risk_level"].value_counts()
+    print(f"Scored {len(action_list):,} paddocks in {time.perf_counter() - started:.1f} s "
+          f"({counts.get('High', 0)} high, {counts.get('Moderate', 0)} moderate risk) -> {args.output}")
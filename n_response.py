@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from nitrogen_engine import UAN_N_PER_TONNE, UREA_N_PER_TONNE, break_even_yield_kg
+
+# --- Yield response to available N (Mitscherlich): yield = a - b * exp(-c * N) ---
+# a = plateau yield (t/ha), b = yield response to N (t/ha), c = curvature (per kg N/ha).
+# Indicative South Coast WA curves; replace with fit_response_curve() on local trial data.
+DEFAULT_RESPONSE_CURVES = {
+    "Wheat": {"a": 5.0, "b": 4.0, "c": 0.020},
+    "Barley": {"a": 5.5, "b": 4.2, "c": 0.020},
+    "Oats": {"a": 4.5, "b": 3.5, "c": 0.020},
+    "Canola": {"a": 2.6, "b": 2.0, "c": 0.018},
+}
+
+# kg N in a tonne of each product, for converting product $/t to $/kg N
+N_PRODUCTS = {"Urea": UREA_N_PER_TONNE, "UAN": UAN_N_PER_TONNE}
+
+MAX_N_RATE = 300.0            # kg N/ha, upper bound for the optimum rate
+FIT_CURVATURE_GRID = np.logspace(-3.5, -0.5, 400)
+
+
+def response_yield(curve, available_n):
+    return curve["a"] - curve["b"] * np.exp(-curve["c"] * np.asarray(available_n, dtype=float))
+
+
+def scale_curve(curve, max_yield):
+    """
+    Rescale a curve so its plateau equals max_yield, keeping the same shape.
+    """
+    factor = max_yield / curve["a"]
+    return {"a": curve["a"] * factor, "b": curve["b"] * factor, "c": curve["c"]}
+
+
+def fit_response_curve(n_rates, yields):
+    """
+    Least-squares Mitscherlich fit to trial data (available N in kg/ha, yield in t/ha).
+    a and b are solved exactly for every curvature on FIT_CURVATURE_GRID at once and
+    the curvature with the smallest residual is kept.
+    """
+    n_rates = np.asarray(n_rates, dtype=float)
+    yields = np.asarray(yields, dtype=float)
+    if n_rates.size < 3:
+        raise ValueError("At least three N rates are needed to fit a response curve.")
+
+    decay = np.exp(-np.outer(FIT_CURVATURE_GRID, n_rates))     # (curvatures, points)
+    decay_mean = decay.mean(axis=1, keepdims=True)
+    yield_mean = yields.mean()
+    decay_centred = decay - decay_mean
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (decay_centred @ (yields - yield_mean)) / (decay_centred ** 2).sum(axis=1)
+    intercept = yield_mean - slope * decay_mean[:, 0]
+    residuals = ((intercept[:, None] + slope[:, None] * decay - yields) ** 2).sum(axis=1)
+    best = np.nanargmin(residuals)
+    return {"a": float(intercept[best]), "b": float(-slope[best]), "c": float(FIT_CURVATURE_GRID[best])}
+
+
+def economic_optimum_n(curve, soil_n, grain_price, n_cost_per_kg, nue):
+    """
+    Fertiliser N rate (kg N/ha) where the marginal grain return equals the N cost.
+    Solves d(grain_price * yield)/dN = n_cost_per_kg for yield = a - b*exp(-c*(soil_n + nue*N)).
+    All arguments broadcast, so passing meshgrids solves a whole price/NUE surface in one pass.
+    """
+    c = curve["c"]
+    grain_price = np.asarray(grain_price, dtype=float)
+    nue = np.asarray(nue, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal_ratio = grain_price * curve["b"] * c * nue / np.asarray(n_cost_per_kg, dtype=float)
+        optimum = (np.log(marginal_ratio) - c * soil_n) / (c * nue)
+    return np.clip(np.nan_to_num(optimum, nan=0.0, neginf=0.0, posinf=MAX_N_RATE), 0, MAX_N_RATE)
+
+
+def economic_optimum_surface(curve, soil_n, grain_prices, product_prices, nue_values, product="Urea"):
+    """
+    Economic optimum N rate over every combination of grain price ($/t), fertiliser
+    product price ($/t) and NUE, returned as a long DataFrame with one row per
+    combination: optimum rate, yield, N cost, margin over N cost and break-even yield.
+    """
+    grain, fert, nue = np.meshgrid(np.asarray(grain_prices, dtype=float),
+                                   np.asarray(product_prices, dtype=float),
+                                   np.asarray(nue_values, dtype=float), indexing="ij")
+    n_cost_per_kg = fert / N_PRODUCTS[product]
+
+    eonr = economic_optimum_n(curve, soil_n, grain, n_cost_per_kg, nue)
+    optimum_yield = response_yield(curve, soil_n + nue * eonr)
+    n_cost = eonr * n_cost_per_kg
+    yield_gain = optimum_yield - response_yield(curve, soil_n)
+
+    return pd.DataFrame({
+        "grain_price": grain.ravel(),
+        "product_price": fert.ravel(),
+        "nue": nue.ravel(),
+        "eonr_kg_n": eonr.ravel(),
+        "yield_t_ha": optimum_yield.ravel(),
+        "n_cost_per_ha": n_cost.ravel(),
+        "margin_over_n_cost": (grain * yield_gain - n_cost).ravel(),
+        "break_even_kg": break_even_yield_kg(n_cost, grain).ravel(),
+    })
@@ -0,0 +1,176 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# --- Budget constants ---
+N_PER_TONNE = 25.0            # kg N per tonne of grain at the reference protein
+REFERENCE_PROTEIN = 11.5      # % protein (or oil) that N_PER_TONNE is quoted at
+SOIL_MINERAL_N_FACTOR = 4     # mg/kg mineral N -> kg/ha
+ORGANIC_N_PER_OC_PERCENT = 1100
+MINERALISATION_RATE = 0.03    # fraction of the organic N pool mineralised per season when not simulated
+LEGUME_N_PER_TONNE = 20.0     # kg N credit per tonne of legume biomass
+UREA_N_PER_TONNE = 460        # kg N in a tonne of urea (46% N)
+UAN_N_PER_TONNE = 320         # kg N in a tonne of UAN (32% N)
+
+# Columns read by evaluate_paddocks, with the default used when a column is missing
+PADDOCK_INPUT_DEFAULTS = {
+    "crop": "Wheat",
+    "yield_t_ha": None,
+    "protein_or_oil": None,
+    "nitrate": None,
+    "ammonium": None,
+    "organic_carbon": None,
+    "legume_biomass": 0.0,
+    "nue": 0.6,
+    "grain_price": None,
+    "urea_price": 835.0,
+    "uan_price": 725.0,
+}
+
+# Optional columns from soil_nitrogen_model; blank cells fall back to the flat mineralisation rate
+SIMULATED_SOIL_N_COLUMNS = ("mineralised_n", "leached_n")
+
+# Default yield, protein/oil and grain price used by the page for each crop
+CROP_DEFAULTS = {
+    "Wheat": {"quality_label": "Target Protein (%)", "quality": 11.5, "yield_t_ha": 4.0, "grain_price": 350.0},
+    "Barley": {"quality_label": "Target Protein (%)", "quality": 11.5, "yield_t_ha": 4.0, "grain_price": 330.0},
+    "Oats": {"quality_label": "Target Protein (%)", "quality": 11.5, "yield_t_ha": 4.0, "grain_price": 280.0},
+    "Canola": {"quality_label": "Target Oil (%)", "quality": 42.0, "yield_t_ha": 2.0, "grain_price": 850.0},
+}
+
+
+def convert_organic_c_to_n(organic_carbon_percent):
+    return organic_carbon_percent * ORGANIC_N_PER_OC_PERCENT
+
+
+def urea_cost_per_kg_n(urea_price):
+    return urea_price / UREA_N_PER_TONNE
+
+
+def uan_cost_per_kg_n(uan_price):
+    return uan_price / UAN_N_PER_TONNE
+
+
+def break_even_yield_kg(total_cost, grain_price):
+    """
+    Grain (kg/ha) needed to pay for a per-hectare cost. Returns inf for a zero grain price.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.divide(total_cost, np.asarray(grain_price, dtype=float) / 1000)
+
+
+def total_n_required(yield_t_ha, protein_or_oil):
+    adjusted_n = (np.asarray(protein_or_oil, dtype=float) / REFERENCE_PROTEIN) * N_PER_TONNE
+    return adjusted_n, yield_t_ha * adjusted_n
+
+
+def soil_mineral_n(nitrate, ammonium):
+    return (np.asarray(nitrate, dtype=float) + ammonium) * SOIL_MINERAL_N_FACTOR
+
+
+def nitrogen_budget_arrays(yield_t_ha, protein_or_oil, nitrate, ammonium, organic_carbon,
+                           legume_biomass, nue, grain_price, urea_price, uan_price,
+                           mineralised_n=None, leached_n=0.0):
+    """
+    Core N budget maths. Every argument may be a scalar or a numpy array/Series,
+    and the outputs broadcast the same way.
+    mineralised_n / leached_n come from soil_nitrogen_model; without them (or where
+    they are NaN) the organic pool mineralises at the flat MINERALISATION_RATE.
+    """
+    adjusted_n, n_total_required = total_n_required(yield_t_ha, protein_or_oil)
+
+    organic_n = convert_organic_c_to_n(np.asarray(organic_carbon, dtype=float))
+    legume_n = np.asarray(legume_biomass, dtype=float) * LEGUME_N_PER_TONNE
+    static_mineralised_n = organic_n * MINERALISATION_RATE
+    if mineralised_n is None:
+        mineralised_n = static_mineralised_n
+    else:
+        mineralised_n = np.asarray(mineralised_n, dtype=float)
+        mineralised_n = np.where(np.isnan(mineralised_n), static_mineralised_n, mineralised_n)
+    leached_n = np.nan_to_num(np.asarray(leached_n, dtype=float))
+    soil_n = soil_mineral_n(nitrate, ammonium) + mineralised_n - leached_n + legume_n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        in_season_n = np.maximum((n_total_required - soil_n) / nue, 0)
+
+    urea_cost_per_unit = urea_cost_per_kg_n(np.asarray(urea_price, dtype=float))
+    uan_cost_per_unit = uan_cost_per_kg_n(np.asarray(uan_price, dtype=float))
+    urea_total_cost = in_season_n * urea_cost_per_unit
+    uan_total_cost = in_season_n * uan_cost_per_unit
+
+    return {
+        "adjusted_n": adjusted_n,
+        "n_total_required": n_total_required,
+        "organic_n": organic_n,
+        "mineralised_n": mineralised_n,
+        "leached_n": leached_n,
+        "legume_n": legume_n,
+        "soil_n": soil_n,
+        "in_season_n": in_season_n,
+        "urea_cost_per_unit": urea_cost_per_unit,
+        "uan_cost_per_unit": uan_cost_per_unit,
+        "urea_total_cost": urea_total_cost,
+        "uan_total_cost": uan_total_cost,
+        "urea_break_even_kg": break_even_yield_kg(urea_total_cost, grain_price),
+        "uan_break_even_kg": break_even_yield_kg(uan_total_cost, grain_price),
+    }
+
+
+def calculate_nitrogen_budget(yield_t_ha, protein_or_oil, nitrate, ammonium, organic_carbon,
+                              nue, grain_price, urea_price, uan_price, legume_biomass=0.0,
+                              mineralised_n=None, leached_n=0.0):
+    """
+    N budget for a single paddock, returned as a dict of floats.
+    """
+    result = nitrogen_budget_arrays(yield_t_ha, protein_or_oil, nitrate, ammonium, organic_carbon,
+                                    legume_biomass, nue, grain_price, urea_price, uan_price,
+                                    mineralised_n, leached_n)
+    return {key: float(value) for key, value in result.items()}
+
+
+def evaluate_paddocks(paddocks):
+    """
+    Vectorised N budget for a DataFrame of paddocks (one row per paddock).
+    Missing optional columns fall back to PADDOCK_INPUT_DEFAULTS; the result is a
+    copy of the input with every budget output added as a column.
+    """
+    missing = [col for col, default in PADDOCK_INPUT_DEFAULTS.items()
+               if default is None and col not in paddocks.columns]
+    if missing:
+        raise ValueError(f"Paddock data is missing required columns: {', '.join(missing)}")
+
+    inputs = {}
+    for col, default in PADDOCK_INPUT_DEFAULTS.items():
+        if col not in paddocks.columns:
+            inputs[col] = default
+        elif default is not None:
+            # Blank cells in optional columns (e.g. no legume) take the default
+            inputs[col] = paddocks[col].fillna(default)
+        else:
+            inputs[col] = paddocks[col]
+    numeric = {
+        col: pd.to_numeric(value, errors="raise").to_numpy(dtype=float)
+        if isinstance(value, pd.Series) else value
+        for col, value in inputs.items() if col != "crop"
+    }
+    for col in SIMULATED_SOIL_N_COLUMNS:
+        if col in paddocks.columns:
+            numeric[col] = pd.to_numeric(paddocks[col], errors="raise").to_numpy(dtype=float)
+
+    result = paddocks.copy()
+    for col, values in nitrogen_budget_arrays(**numeric).items():
+        result[col] = np.broadcast_to(values, len(paddocks))
+    return result
+
+
+# Batch run over a soil-lab export
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the nitrogen budget for every paddock in a CSV.")
+    parser.add_argument("input_csv", help="Paddock CSV with columns: " + ", ".join(PADDOCK_INPUT_DEFAULTS))
+    parser.add_argument("output_csv", help="Where to write the paddocks with budget columns added")
+    args = parser.parse_args()
+
+    budget = evaluate_paddocks(pd.read_csv(args.input_csv))
+    budget.to_csv(args.output_csv, index=False)
+    print(f"Wrote nitrogen budgets for {len(budget)} paddocks to {args.output_csv}")
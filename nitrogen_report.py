@@ -0,0 +1,149 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from fpdf import FPDF
+from matplotlib.figure import Figure
+
+try:
+    import qrcode
+    QR_AVAILABLE = True
+except ImportError:
+    QR_AVAILABLE = False
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), "sca_logo.jpg")
+REPORT_URL = "https://sca.agtools.app"
+
+
+# --- Helper Function ---
+def clean_ascii(text):
+    return text.encode('ascii', errors='replace').decode('ascii')
+
+
+# --- Shared report assets, decoded once per process ---
+@lru_cache(maxsize=1)
+def load_logo():
+    # Kept as the original JPEG bytes so FPDF embeds it as-is instead of re-encoding it
+    with open(LOGO_PATH, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=1)
+def load_qr_code():
+    if not QR_AVAILABLE:
+        return None
+    return qrcode.make(REPORT_URL).get_image().convert("RGB")
+
+
+def render_rainfall_chart(months, rainfall_mm, station_code):
+    """
+    Bar chart of monthly rainfall as PNG bytes. Uses a standalone Figure rather than
+    pyplot so concurrent reports never share matplotlib state.
+    """
+    fig = Figure(figsize=(3.5, 1.5))
+    ax = fig.subplots()
+    ax.bar(months, rainfall_mm)
+    ax.set_title(f"Rainfall at {station_code}", fontsize=9)
+    ax.set_ylabel("mm", fontsize=8)
+    ax.tick_params(labelsize=8)
+    # Fixed margins; tight_layout() costs more than drawing the chart itself
+    fig.subplots_adjust(left=0.14, right=0.98, top=0.86, bottom=0.16)
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+# --- PDF Export ---
+class PDF(FPDF):
+    def header(self):
+        self.image(BytesIO(load_logo()), x=10, w=190)
+        self.ln(28)
+        self.set_font("Helvetica", 'B', 16)
+        self.cell(0, 10, "Nitrogen Budget Report", new_x="LMARGIN", new_y="NEXT", align='C')
+        self.ln(8)
+
+    def summary_side_by_side(self, rainfall_chart, yield_text, soil_text, rain_data, rain_source,
+                             summary_text, roi_text, qr_image):
+        self.set_font("Helvetica", '', 10)
+        y_start = self.get_y()
+
+        self.set_xy(10, y_start)
+        rain_text = "\n".join([f"{month}: {val} mm" for month, val in rain_data.items()])
+        left_content = clean_ascii(
+            f"Yield Expectations\n{yield_text}\n\n"
+            f"Soil Test Data\n{soil_text}\n\n"
+            f"Rainfall\n{rain_source}\n{rain_text}"
+        )
+        self.multi_cell(90, 6, left_content)
+        if rainfall_chart:
+            self.image(BytesIO(rainfall_chart), x=10, y=self.get_y(), w=90)
+
+        x_right = 110
+        self.set_xy(x_right, y_start)
+        self.set_font("Helvetica", 'B', 10)
+        self.set_x(x_right)
+        self.cell(0, 6, "Nitrogen Summary", new_x="LMARGIN", new_y="NEXT")
+        self.set_font("Helvetica", '', 10)
+        self.set_x(x_right)
+        self.multi_cell(85, 6, clean_ascii(summary_text))
+        self.ln(3)
+
+        self.set_font("Helvetica", 'B', 10)
+        self.set_x(x_right)
+        self.cell(0, 6, "ROI & Break-even Analysis", new_x="LMARGIN", new_y="NEXT")
+        self.set_font("Helvetica", '', 10)
+        self.set_x(x_right)
+        self.multi_cell(85, 6, clean_ascii(roi_text))
+        if qr_image is not None:
+            self.image(qr_image, x=165, y=260, w=30)
+
+
+def report_sections(inputs, budget):
+    """
+    Text blocks for the report. inputs holds the page inputs (crop_type, quality_label,
+    protein_or_oil, yield_t_ha, nue, nitrate, ammonia, legume_biomass, grain_price,
+    urea_price, uan_price) and budget the nitrogen_engine outputs.
+    """
+    yield_info = (
+        f"Crop Type: {inputs['crop_type']}\nExpected Yield: {inputs['yield_t_ha']:.1f} t/ha\n"
+        f"{inputs['quality_label']}: {inputs['protein_or_oil']}%\nNUE: {inputs['nue']}"
+    )
+    soil_info = (
+        f"Nitrate: {inputs['nitrate']} mg/kg\nAmmonia: {inputs['ammonia']} mg/kg\n"
+        f"Organic N Pool: {budget['organic_n']:.1f} kg/ha\nMineralised N: {budget['mineralised_n']:.1f} kg/ha\n"
+        f"Leached N: {budget['leached_n']:.1f} kg/ha\n"
+        f"Legume N Credit: {budget['legume_n']:.1f} kg/ha ({inputs['legume_biomass']:.1f} t/ha biomass)"
+    )
+    summary = (
+        f"Total N Required: {budget['n_total_required']:.1f} kg/ha\nSoil N Contribution: {budget['soil_n']:.1f} kg/ha\n"
+        f"In-season N Required: {budget['in_season_n']:.1f} kg/ha"
+    )
+    roi = (
+        f"Grain Price: ${inputs['grain_price']:.0f}/t\nUrea Price: ${inputs['urea_price']:.0f}/t (46% N)\n"
+        f"UAN Price: ${inputs['uan_price']:.0f}/t (32% N)\n\n"
+        f"Urea Cost: ${budget['urea_total_cost']:.2f}/ha\nBreak-even: {budget['urea_break_even_kg']:.0f} kg/ha\n"
+        f"UAN Cost: ${budget['uan_total_cost']:.2f}/ha\nBreak-even: {budget['uan_break_even_kg']:.0f} kg/ha"
+    )
+    return yield_info, soil_info, summary, roi
+
+
+def add_report_page(pdf, inputs, budget, rain, rain_source, station_code, rainfall_chart=None):
+    """
+    Append one paddock's report page to pdf. rain maps month -> mm; the chart is
+    rendered from it unless pre-rendered PNG bytes are passed in.
+    """
+    if rainfall_chart is None and rain:
+        rainfall_chart = render_rainfall_chart(list(rain), list(rain.values()), station_code)
+    yield_info, soil_info, summary, roi = report_sections(inputs, budget)
+    pdf.add_page()
+    pdf.summary_side_by_side(rainfall_chart, yield_info, soil_info, rain, rain_source,
+                             summary, roi, load_qr_code())
+
+
+def build_nitrogen_report(inputs, budget, rain, rain_source, station_code, rainfall_chart=None):
+    """
+    Render the nitrogen budget report entirely in memory and return the PDF bytes.
+    """
+    pdf = PDF()
+    add_report_page(pdf, inputs, budget, rain, rain_source, station_code, rainfall_chart)
+    return bytes(pdf.output())
@@ -0,0 +1,183 @@
+"""
+Paddock registry (paddock_id, client, lat, lon, crop, variety) and spatial joins
+to the weather sources: the nearest station in dpird_stations.csv, or the DPIRD
+grid cell a paddock falls in.
+
+    registry = load_registry("paddocks.csv")
+    registry = assign_stations(registry, max_distance_km=50)
+    registry = assign_grid_cells(registry, RAIN_URL)
+
+Coordinates are indexed as points on the unit sphere, so straight-line (chord)
+distance ranks stations exactly as great-circle distance does, with no projection
+error across the state. Nearest-station lookups use a scipy KD-tree when scipy is
+installed and a chunked brute-force numpy search otherwise; both do the whole
+registry in one call.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from dpird_weather_fetcher import load_station_table
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+REGISTRY_COLUMNS = ["paddock_id", "client", "lat", "lon", "crop", "variety"]
+EARTH_RADIUS_KM = 6371.0
+# Paddocks per brute-force block; keeps the distance matrix to a few MB with hundreds of stations
+BRUTE_FORCE_CHUNK = 2048
+
+
+def load_registry(path):
+    """
+    Read a registry from .csv or .parquet and check its columns and coordinates.
+    """
+    registry = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return validate_registry(registry)
+
+
+def validate_registry(registry):
+    missing = [col for col in REGISTRY_COLUMNS if col not in registry.columns]
+    if missing:
+        raise ValueError(f"Paddock registry is missing columns: {', '.join(missing)}")
+    if registry["paddock_id"].duplicated().any():
+        duplicates = registry.loc[registry["paddock_id"].duplicated(), "paddock_id"].unique()[:5]
+        raise ValueError(f"Duplicate paddock IDs: {', '.join(map(str, duplicates))}")
+
+    registry = registry.copy()
+    registry["lat"] = pd.to_numeric(registry["lat"], errors="coerce")
+    registry["lon"] = pd.to_numeric(registry["lon"], errors="coerce")
+    bad = ~registry["lat"].between(-90, 90) | ~registry["lon"].between(-180, 180)
+    if bad.any():
+        raise ValueError(f"Invalid coordinates for paddocks: "
+                         f"{', '.join(map(str, registry.loc[bad, 'paddock_id'].head(5)))}")
+    return registry
+
+
+# --- Station index ---
+def unit_vectors(lat, lon):
+    """
+    Points on the unit sphere, shape (n, 3).
+    """
+    lat, lon = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def build_station_index(stations):
+    """
+    Spatial index over a station table with code, lat and lon columns.
+    """
+    xyz = unit_vectors(stations["lat"], stations["lon"])
+    return {
+        "codes": stations["code"].to_numpy(),
+        "xyz": xyz,
+        "tree": cKDTree(xyz) if cKDTree is not None else None,
+    }
+
+
+@lru_cache(maxsize=1)
+def default_station_index():
+    return build_station_index(load_station_table())
+
+
+def _brute_force_nearest(station_xyz, points, k):
+    distances, indices = [], []
+    for start in range(0, len(points), BRUTE_FORCE_CHUNK):
+        block = points[start:start + BRUTE_FORCE_CHUNK]
+        # Both sides are unit vectors, so squared chord length is 2 - 2 * dot product
+        d2 = 2 - 2 * block @ station_xyz.T
+        if k == 1:
+            idx = d2.argmin(axis=1)[:, None]
+        elif k < d2.shape[1]:
+            idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(d2.shape[1]), d2.shape).copy()
+        block_d2 = np.take_along_axis(d2, idx, axis=1)
+        order = np.argsort(block_d2, axis=1)
+        distances.append(np.sqrt(np.clip(np.take_along_axis(block_d2, order, axis=1), 0, None)))
+        indices.append(np.take_along_axis(idx, order, axis=1))
+    if not distances:
+        return np.empty((0, k)), np.empty((0, k), dtype=int)
+    return np.vstack(distances), np.vstack(indices)
+
+
+def nearest_stations(lat, lon, k=1, index=None):
+    """
+    The k nearest stations to each point. Returns (distances_km, station_positions),
+    both shaped (n, k), nearest first; positions index into index["codes"].
+    """
+    index = index or default_station_index()
+    k = min(k, len(index["codes"]))
+    points = unit_vectors(lat, lon)
+    if index["tree"] is not None:
+        chords, positions = index["tree"].query(points, k=k)
+        chords, positions = chords.reshape(len(points), k), positions.reshape(len(points), k)
+    else:
+        chords, positions = _brute_force_nearest(index["xyz"], points, k)
+    return chord_to_km(chords), positions
+
+
+def assign_stations(registry, max_distance_km=None, index=None):
+    """
+    Add station and station_distance_km columns for each paddock's nearest station.
+    Paddocks further than max_distance_km from any station get no station.
+    """
+    index = index or default_station_index()
+    registry = registry.copy()
+    distances, positions = nearest_stations(registry["lat"], registry["lon"], index=index)
+    station = pd.Series(index["codes"][positions[:, 0]], index=registry.index, dtype=object)
+    distance = pd.Series(distances[:, 0], index=registry.index)
+    if max_distance_km is not None:
+        station = station.where(distance <= max_distance_km)
+    registry["station"] = station
+    registry["station_distance_km"] = distance.round(2)
+    return registry
+
+
+# --- Grid cells ---
+def nearest_cells(coords, values):
+    """
+    Index of the nearest grid coordinate for each value, for a 1-D regular or
+    irregular coordinate axis in either order.
+    """
+    coords = np.asarray(coords, dtype=float)
+    values = np.asarray(values, dtype=float)
+    descending = coords[0] > coords[-1]
+    ordered = coords[::-1] if descending else coords
+    right = np.clip(np.searchsorted(ordered, values), 1, len(ordered) - 1)
+    left = right - 1
+    nearest = np.where(np.abs(values - ordered[left]) <= np.abs(ordered[right] - values), left, right)
+    return len(coords) - 1 - nearest if descending else nearest
+
+
+def grid_axes(url):
+    """
+    The lat and lon coordinates of a DPIRD gridded dataset.
+    """
+    import xarray as xr
+    with xr.open_dataset(url) as ds:
+        return ds["lat"].to_numpy(), ds["lon"].to_numpy()
+
+
+def assign_grid_cells(registry, url=None, grid_lat=None, grid_lon=None):
+    """
+    Add the lat_idx/lon_idx of the grid cell each paddock falls in, plus the cell
+    centre as cell_lat/cell_lon. Pass a dataset url, or the grid axes directly.
+    Paddocks sharing a cell can then share one weather extraction.
+    """
+    if grid_lat is None or grid_lon is None:
+        grid_lat, grid_lon = grid_axes(url)
+    registry = registry.copy()
+    registry["lat_idx"] = nearest_cells(grid_lat, registry["lat"])
+    registry["lon_idx"] = nearest_cells(grid_lon, registry["lon"])
+    registry["cell_lat"] = np.asarray(grid_lat)[registry["lat_idx"]]
+    registry["cell_lon"] = np.asarray(grid_lon)[registry["lon_idx"]]
+    return registry
@@ -0,0 +1,162 @@
+"""
+Score a paddock register row for the disease that matters at its crop stage:
+canola at leaf stages for blackleg, canola from flowering for sclerotinia,
+wheat for septoria and barley for rust.
+"""
+import pandas as pd
+
+from assess_disease_risks import assess_rust_risk, assess_sclerotinia_risk, assess_septoria_risk
+from blackleg_risk_tool import evaluate_blackleg_risk
+from crop_stage_model import PRE_EMERGENCE_STAGE
+
+# Register columns and their defaults; None means the column is required
+REGISTER_DEFAULTS = {
+    "paddock_id": None,
+    "crop": None,
+    "crop_stage": None,
+    "station": None,
+    "variety": "Other",
+    "yield_t_ha": 2.5,
+    "grain_price": None,            # filled per crop from DEFAULT_GRAIN_PRICES
+    "seed_treatment": "None",
+    "prior_fungicide": "None",
+    "has_resistance": False,
+    "days_since_rain": 3,
+    "leaf_wetness_hours": 12,
+    "rain_days_last_week": 2,
+    "rain_forecast_hours": 0,       # hours until forecast rain, 0 if none; see spray_windows
+    "fungicide_cost": 35.0,
+    "application_cost": 12.0,
+}
+REQUIRED_COLUMNS = [col for col, default in REGISTER_DEFAULTS.items() if default is None and col != "grain_price"]
+
+# Same defaults as the fungicide decision page
+DEFAULT_GRAIN_PRICES = {"Canola": 850, "Wheat": 350, "Barley": 320}
+
+# Indicative share of yield protected by a spray at each risk level, used to rank ROI
+RISK_YIELD_LOSS = {"High": 0.15, "Moderate": 0.07, "Low": 0.02}
+RISK_RANK = {"High": 3, "Moderate": 2, "Low": 1, "Unknown": 0}
+
+BLACKLEG_ACTION_RISK = {
+    "Apply fungicide now": "High",
+    "Monitor closely or apply if yield potential is high": "Moderate",
+    "Fungicide not required yet": "Low",
+}
+
+
+def _stage_missing(crop_stage):
+    # A blank register cell reads as NaN, which would otherwise score as the stage "nan"
+    return pd.isna(crop_stage) or str(crop_stage).strip() == ""
+
+
+def disease_for(crop, crop_stage):
+    if _stage_missing(crop_stage):
+        return None
+    stage = str(crop_stage).lower()
+    if stage == PRE_EMERGENCE_STAGE.lower():
+        return None
+    if crop == "Canola":
+        return "blackleg" if "leaf" in stage or stage == "cotyledon" else "sclerotinia"
+    if crop == "Wheat":
+        return "septoria"
+    if crop == "Barley":
+        return "rust"
+    return None
+
+
+def _ratio(numerator, denominator):
+    # A zero price or spray cost (e.g. a blank register cell) leaves the ratio undefined
+    return numerator / denominator if denominator else float("nan")
+
+
+def score_paddock(row):
+    """
+    Score one register row (a dict with the REGISTER_DEFAULTS keys plus rain_mm,
+    temperature_c and rh_percent) and return one action-list row.
+    """
+    disease = disease_for(row["crop"], row["crop_stage"])
+    seed_treatment, prior_fungicide = str(row["seed_treatment"]), str(row["prior_fungicide"])
+    seed_dressed = seed_treatment != "None"
+    prior_applied = prior_fungicide != "None"
+    temp, rh, rain = row["temperature_c"], row["rh_percent"], row["rain_mm"]
+    rain_forecast_hours = row.get("rain_forecast_hours", 0)
+
+    if disease == "blackleg":
+        result = evaluate_blackleg_risk({
+            "variety": row["variety"], "crop_stage": row["crop_stage"], "yield_potential": row["yield_t_ha"],
+            "grain_price": row["grain_price"], "fungicide_cost": row["fungicide_cost"],
+            "application_cost": row["application_cost"], "rain_mm": rain, "rh_percent": rh,
+            "temperature_c": temp, "seed_treatment": seed_treatment, "prior_fungicide": prior_fungicide,
+            "rain_forecast_hours": rain_forecast_hours,
+        })
+        risk, recommendation = BLACKLEG_ACTION_RISK[result["recommended_action"]], result["recommended_action"]
+    elif disease == "sclerotinia":
+        result = assess_sclerotinia_risk(temp, rh, rain, row["days_since_rain"], row["leaf_wetness_hours"],
+                                         row["rain_days_last_week"], seed_dressed, prior_applied,
+                                         seed_treatment, prior_fungicide, row["crop_stage"], rain_forecast_hours)
+        risk, recommendation = result["risk_level"], result["recommendation"]
+    elif disease == "septoria":
+        result = assess_septoria_risk(temp, rh, rain, row["crop_stage"], bool(row["has_resistance"]),
+                                      seed_dressed, prior_applied, seed_treatment, prior_fungicide,
+                                      rain_forecast_hours)
+        risk, recommendation = result["risk_level"], result["recommendation"]
+    elif disease == "rust":
+        result = assess_rust_risk(temp, rh, row["crop_stage"], bool(row["has_resistance"]),
+                                  seed_dressed, prior_applied, seed_treatment, prior_fungicide, rain_forecast_hours)
+        risk, recommendation = result["risk_level"], result["recommendation"]
+    else:
+        return {"paddock_id": row["paddock_id"], "crop": row["crop"], "crop_stage": row["crop_stage"],
+                "station": row["station"], "disease": None, "risk_level": "Unknown",
+                "recommendation": "Crop stage missing" if _stage_missing(row["crop_stage"])
+                else "Crop not emerged yet" if row["crop_stage"] == PRE_EMERGENCE_STAGE
+                else f"No disease model for {row['crop']}"}
+
+    spray_cost = row["fungicide_cost"] + row["application_cost"]
+    protected_value = row["yield_t_ha"] * RISK_YIELD_LOSS[risk] * row["grain_price"]
+    return {
+        "paddock_id": row["paddock_id"],
+        "crop": row["crop"],
+        "crop_stage": row["crop_stage"],
+        "station": row["station"],
+        "disease": disease,
+        "risk_level": risk,
+        "recommendation": recommendation,
+        "spray_cost_per_ha": spray_cost,
+        "break_even_kg": _ratio(spray_cost, row["grain_price"]) * 1000,
+        "net_benefit_per_ha": protected_value - spray_cost,
+        "roi": _ratio(protected_value - spray_cost, spray_cost),
+        "fungicide_options": ", ".join(f["name"] for f in result["fungicide_options"]),
+        "warnings": " | ".join(result["warnings"]),
+    }
+
+
+def score_rows(rows):
+    return [score_paddock(row) for row in rows]
+
+
+def prepare_register(register):
+    """
+    Fill optional register columns with their defaults and check the required ones.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in register.columns]
+    if missing:
+        raise ValueError(f"Paddock register is missing columns: {', '.join(missing)}")
+
+    register = register.copy()
+    for col, default in REGISTER_DEFAULTS.items():
+        if default is not None:
+            register[col] = register[col].fillna(default) if col in register.columns else default
+    grain_default = register["crop"].map(DEFAULT_GRAIN_PRICES).fillna(DEFAULT_GRAIN_PRICES["Wheat"])
+    register["grain_price"] = register["grain_price"].fillna(grain_default) if "grain_price" in register.columns \
+        else grain_default
+    return register
+
+
+def sort_action_list(scored):
+    """
+    Highest risk first, then the largest expected return from spraying.
+    """
+    scored = pd.DataFrame(scored)
+    scored["_rank"] = scored["risk_level"].map(RISK_RANK)
+    return (scored.sort_values(["_rank", "net_benefit_per_ha"], ascending=[False, False], na_position="last")
+            .drop(columns="_rank").reset_index(drop=True))
@@ -0,0 +1,45 @@
+import streamlit as st
+import os
+import sys
+import pandas as pd
+
+# Enable module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import perf
+
+# Only shows anything when the server was started with SCA_PERF=1
+if not perf.ENABLED:
+    st.info("Nothing to see here.")
+    st.stop()
+
+st.markdown("### ⏱ Performance Diagnostics")
+st.caption(f"Rolling window of the last {perf.ROLLING_WINDOW} samples per page and span, "
+           f"shared by every session on this server process (pid {os.getpid()}).")
+
+st.subheader("All sessions")
+process_rows = perf.process_metrics()
+if process_rows:
+    st.dataframe(pd.DataFrame(process_rows), hide_index=True)
+else:
+    st.write("No reruns recorded yet. Open one of the tool pages first.")
+
+st.subheader("This session")
+session_rows = perf.session_metrics()
+if session_rows:
+    st.dataframe(pd.DataFrame(session_rows), hide_index=True)
+
+reruns = perf.session_reruns()
+if reruns:
+    st.markdown("**Recent reruns (ms per span)**")
+    st.dataframe(pd.DataFrame(reruns[::-1]).round(1), hide_index=True)
+
+# --- Metrics Export ---
+st.markdown("---")
+st.caption(f"Metrics are also written to `{perf.METRICS_PATH}` at most every "
+           f"{perf.EXPORT_INTERVAL_SECONDS} s while pages rerun.")
+if st.button("Export metrics now"):
+    path = perf.export_metrics()
+    with open(path) as f:
+        st.download_button("📥 Download metrics JSON", data=f.read(), file_name="perf_metrics.json",
+                           mime="application/json")
+    st.success(f"Wrote {path}")
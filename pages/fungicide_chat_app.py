@@ -1,17 +1,40 @@
 import streamlit as st
 import os
+import sys
 import certifi
-from openai import OpenAI
+
+# Enable module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import perf
+from chat_history import StubChatClient, add_message, new_history, request_messages
+from response_cache import get_cached_response, prompt_version, store_response
+from retrieval_index import default_index, grounding_message
 
 # Fix for SSL cert errors
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
 
-# OpenAI setup
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+# Messages shown in full each rerun; older ones sit behind a toggle
+DISPLAY_RECENT_MESSAGES = 20
+
+CHAT_MODEL = "gpt-3.5-turbo"
+
+# OpenAI setup. SCA_CHAT_STUB=1 swaps in an in-process stub client and
+# SCA_CHAT_BASE_URL points at another server, e.g. stub_model_server.py.
+@st.cache_resource
+def get_client():
+    if os.environ.get("SCA_CHAT_STUB"):
+        return StubChatClient()
+    from openai import OpenAI
+    base_url = os.environ.get("SCA_CHAT_BASE_URL")
+    if base_url:
+        return OpenAI(base_url=base_url, api_key=os.environ.get("OPENAI_API_KEY", "local-stub"))
+    return OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
 
 # Streamlit UI setup
 st.set_page_config(page_title="Fungicide Decision Assistant", page_icon="🧪")
-st.image("sca_logo.jpg", use_column_width=True)
+perf.start_rerun("fungicide_chat_app")
+with perf.span("image"):
+    st.image("sca_logo.jpg", use_column_width=True)
 st.title("💬 Fungicide Decision Assistant")
 st.caption("Chat with an agronomy GPT trained to help with disease and fungicide decisions in broadacre crops.")
 
@@ -28,40 +51,70 @@ You are a highly intelligent and cautious agronomic decision-making assistant fo
 
 NEVER lie, speculate, or invent products. Never guess. Always act as a highly experienced WA agronomist advising a client.
 """
+# Cached answers are tied to the prompt and the reference data they were generated with
+SYSTEM_PROMPT_VERSION = prompt_version(
+    SYSTEM_PROMPT + "".join(doc["text"] for doc in default_index()["documents"])
+)
 
 # --- GPT response function ---
-def call_gpt_response(user_input):
-    chat_completion = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_input}
-        ],
-        temperature=0.4
+def stream_gpt_response(history, client, grounding=None):
+    # Sends the retained context (summary + recent turns), not just the latest question,
+    # with the reference notes for that question, and yields the reply as it is generated
+    messages = request_messages(history, SYSTEM_PROMPT)
+    if grounding:
+        messages.insert(1, grounding)
+    stream = client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=0.4,
+        stream=True
     )
-    return chat_completion.choices[0].message.content
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
-# --- Chat state memory ---
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "assistant", "content": "Hi 👋. I'm your fungicide decision assistant. What crop, variety, and issue are you working with today?"}
-    ]
+# --- Chat state memory (token-budgeted, capped per session) ---
+if "chat" not in st.session_state:
+    st.session_state.chat = new_history(
+        "Hi 👋. I'm your fungicide decision assistant. What crop, variety, and issue are you working with today?"
+    )
+chat = st.session_state.chat
 
 # --- Display chat history ---
-for msg in st.session_state.messages:
-    st.chat_message(msg["role"]).write(msg["content"])
+with perf.span("render"):
+    earlier = chat["messages"][:-DISPLAY_RECENT_MESSAGES]
+    if earlier and st.toggle(f"Show {len(earlier)} earlier messages"):
+        for msg in earlier:
+            st.chat_message(msg["role"]).write(msg["content"])
+    for msg in chat["messages"][-DISPLAY_RECENT_MESSAGES:]:
+        st.chat_message(msg["role"]).write(msg["content"])
 
 # --- Input box ---
 user_input = st.chat_input("Enter disease concern, crop stage, or fungicide question...")
 
 if user_input:
-    st.session_state.messages.append({"role": "user", "content": user_input})
+    add_message(chat, "user", user_input)
     st.chat_message("user").write(user_input)
 
-    try:
-        response = call_gpt_response(user_input)
-    except Exception as e:
-        response = f"❌ Error getting response from GPT: {e}"
+    # Only a conversation's opening question is cached; later answers depend on the context
+    cacheable = len(chat["context"]) == 1 and not chat["summary"]
+    with st.chat_message("assistant"):
+        try:
+            with perf.span("fetch"):
+                response = get_cached_response(user_input, SYSTEM_PROMPT_VERSION, CHAT_MODEL) if cacheable else None
+                if response is not None:
+                    st.write(response)
+                    st.caption("Answered from saved responses")
+                else:
+                    with perf.span("retrieve"):
+                        grounding = grounding_message(user_input)
+                    response = st.write_stream(stream_gpt_response(chat, get_client(), grounding))
+                    if cacheable:
+                        store_response(user_input, SYSTEM_PROMPT_VERSION, CHAT_MODEL, response)
+            add_message(chat, "assistant", response)
+        except Exception as e:
+            response = f"❌ Error getting response from GPT: {e}"
+            st.write(response)
+            add_message(chat, "assistant", response, in_context=False)
 
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    st.chat_message("assistant").write(response)
+perf.end_rerun()
@@ -26,63 +26,79 @@ st.markdown("""
 
 # Enable module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from dpird_weather_fetcher import fetch_weather_from_dpird_live
+import perf
+from assessment_log import log_assessment
+from shared_cache import shared_cached
+from crop_stage_model import MATURITY_FACTORS, VARIETY_MATURITY, predict_stages, station_temperatures
+from dpird_weather_fetcher import fetch_latest_weather, load_station_table
+from weather_snapshot import start_background_refresh
 from assess_disease_risks import assess_sclerotinia_risk, assess_septoria_risk, assess_rust_risk
+from fungicide_products import (count_sdhi_uses, foliar_fungicide_lookup, fungicide_roi_table,
+                                 seed_treatment_lookup)
+
+perf.start_rerun("fungicide_decision_tool")
+# Keep the offline weather snapshot fresh while DPIRD is reachable
+start_background_refresh()
 
 # --- HEADER ---
-st.image("sca_logo.jpg", use_container_width=True)
+with perf.span("image"):
+    st.image("sca_logo.jpg", use_container_width=True)
 st.markdown("### 🦠 Disease Risk & Fungicide Response – South Coastal Agencies")
-# Reference Data
-seed_treatment_lookup = {
-    "None": {"group": "", "moa": ""},
-    "Saltro": {"group": "Group 7", "moa": "SDHI"},
-    "ILeVO": {"group": "Group 7", "moa": "SDHI"},
-    "Flutriafol": {"group": "Group 3", "moa": "DMI"},
-    "Jocky": {"group": "Group 3", "moa": "DMI"},
-    "Vibrance": {"group": "Group 7", "moa": "SDHI"},
-    "EverGol Extend": {"group": "Group 7", "moa": "SDHI"},
-    "EverGol Energy": {"group": "Group 7", "moa": "SDHI"},
-}
-
-foliar_fungicide_lookup = {
-    "None": {"group": "", "moa": ""},
-    "Prothio T": {"group": "Group 3", "moa": "DMI"},
-    "Aviator Xpro": {"group": "Group 3+11", "moa": "DMI + QoI"},
-    "Miravis Star": {"group": "Group 3+7", "moa": "DMI + SDHI"},
-    "Elatus Ace": {"group": "Group 7+11", "moa": "SDHI + QoI"},
-    "Miravis": {"group": "Group 7", "moa": "SDHI"},
-    "Azoxy Xtra": {"group": "Group 11 + 3", "moa": "DMI + QoI"},
-    "Epoxiconazole": {"group": "Group 3", "moa": "DMI"},
-    "Veritas Opti": {"group": "Group 3 + 11 + 29", "moa": "DMI + QoI"},
-}
-
-fungicide_costs = {
-    "Prosaro": {"cost_per_ha": 35, "rate": "150 mL/ha", "action": "Curative + Protective"},
-    "Aviator Xpro": {"cost_per_ha": 38, "rate": "300 mL/ha", "action": "Curative + Protective"},
-    "Miravis Star": {"cost_per_ha": 42, "rate": "500 mL/ha", "action": "Protective"},
-    "Elatus Ace": {"cost_per_ha": 40, "rate": "300 mL/ha", "action": "Protective"},
-    "Miravis": {"cost_per_ha": 36, "rate": "200 mL/ha", "action": "Protective"},
-    "Azoxy Xtra": {"cost_per_ha": 33, "rate": "300 mL/ha", "action": "Curative + Protective"},
-    "Epoxiconazole": {"cost_per_ha": 28, "rate": "250 mL/ha", "action": "Curative"},
-    "Veritas Opti": {"cost_per_ha": 48, "rate": "750 mL/ha", "action": "Protective"},
-}
-
-def count_sdhi_uses(seed_treatment, prior_fungicide):
-    seed_sdhi = "sdhi" in seed_treatment_lookup.get(seed_treatment, {}).get("moa", "").lower()
-    foliar_sdhi = "sdhi" in foliar_fungicide_lookup.get(prior_fungicide, {}).get("moa", "").lower()
-    return int(seed_sdhi) + int(foliar_sdhi)
+# DPIRD observations only change a few times a day, so cache per station for all
+# sessions, and in the shared cache for the other app processes
+WEATHER_CACHE_TTL_SECONDS = 30 * 60
+
+@st.cache_data(ttl=WEATHER_CACHE_TTL_SECONDS, show_spinner="Fetching DPIRD weather...")
+@shared_cached("station_weather", ttl=WEATHER_CACHE_TTL_SECONDS)
+def get_station_weather(code):
+    weather = fetch_latest_weather(code)
+    # Raise so failed fetches are retried on the next rerun instead of being cached
+    if "error" in weather:
+        raise RuntimeError(weather["error"])
+    return weather
+
+@st.cache_data(ttl=WEATHER_CACHE_TTL_SECONDS, show_spinner="Estimating crop stage...")
+@shared_cached("crop_stage", ttl=WEATHER_CACHE_TTL_SECONDS)
+def estimate_crop_stage(crop, station, sowing_date, maturity):
+    paddock = pd.DataFrame({"crop": [crop], "station": [station], "sowing_date": [sowing_date],
+                            "maturity": [maturity]})
+    temperature = station_temperatures([station], year=sowing_date.year, start=sowing_date)
+    return predict_stages(paddock, temperature).iloc[0].to_dict()
 
 # Crop type & growth stage
 crop_type = st.selectbox("🌾 Select Crop Type", ["Canola", "Wheat", "Barley"])
 if crop_type == "Canola":
     variety = st.selectbox("Canola Variety", ["Hunter", "Emu", "4540P", "4520P", "Other"])
-    crop_stage = st.selectbox("Crop Stage", ["2-leaf", "4-leaf", "6-leaf", "10% Flower", "50% Flower", "Petal Drop"])
+    stage_label, stage_options = "Crop Stage", ["2-leaf", "4-leaf", "6-leaf", "10% Flower", "50% Flower", "Petal Drop"]
 elif crop_type == "Wheat":
     variety = st.selectbox("Wheat Variety", ["Scepter", "Vixen", "Other"])
-    crop_stage = st.selectbox("Crop Stage (Zadoks)", ["Z21", "Z30", "Z39", "Z49", "Z65"])
+    stage_label, stage_options = "Crop Stage (Zadoks)", ["Z21", "Z30", "Z39", "Z49", "Z65"]
 else:
     variety = st.selectbox("Barley Variety", ["La Trobe", "RGT Planet", "Other"])
-    crop_stage = st.selectbox("Crop Stage (Zadoks)", ["Z21", "Z30", "Z39", "Z49", "Z65"])
+    stage_label, stage_options = "Crop Stage (Zadoks)", ["Z21", "Z30", "Z39", "Z49", "Z65"]
+
+# Optionally preselect the stage predicted from thermal time since sowing
+stage_index = 0
+if st.checkbox("Estimate stage from sowing date"):
+    stage_cols = st.columns(3)
+    sowing_date = stage_cols[0].date_input("Sowing Date", value=datetime(datetime.now().year, 5, 1))
+    stage_station = stage_cols[1].selectbox("Nearest DPIRD Station", load_station_table()["code"].tolist())
+    maturity_classes = list(MATURITY_FACTORS)
+    maturity = stage_cols[2].selectbox("Maturity", maturity_classes,
+                                       index=maturity_classes.index(VARIETY_MATURITY.get(variety, "mid")))
+    with perf.span("fetch"):
+        try:
+            estimate = estimate_crop_stage(crop_type, stage_station, sowing_date, maturity)
+        except Exception as e:
+            estimate = None
+            st.warning(f"⚠️ Could not estimate crop stage: {e}")
+    if estimate:
+        st.caption(f"{estimate['thermal_time']:.0f} °C·days since sowing: about **{estimate['crop_stage']}**"
+                   + (f", {estimate['next_stage']} expected around {estimate['next_stage_date']:%d %b}"
+                      if estimate["next_stage"] and pd.notna(estimate["next_stage_date"]) else ""))
+        if estimate["crop_stage"] in stage_options:
+            stage_index = stage_options.index(estimate["crop_stage"])
+crop_stage = st.selectbox(stage_label, stage_options, index=stage_index)
 
 # Agronomic & Economic Inputs
 st.markdown("### 🌱 Agronomic Details")
@@ -104,134 +120,172 @@ if disease_present:
 else:
     selected_disease = None
 
+# The sections below are fragments: changing a widget inside one only reruns that
+# section, and they share their values through st.session_state.
+
 # Weather
-st.markdown("### ☔️ Environmental Conditions")
-weather_input_mode = st.radio("Select Weather Input Mode", ["Fetch from DPIRD", "Manual Input"])
-if weather_input_mode == "Fetch from DPIRD":
-    station_code = st.text_input("Enter DPIRD Station Code", value="ESP")
-    weather = fetch_weather_from_dpird_live(station_code)
-    if "error" in weather:
-        st.warning(f"⚠️ Could not load weather data: {weather['error']}")
-        rain = rh = temp = 0
-    else:
-        rain = weather["rain_mm"]
-        rh = weather["rh_percent"]
-        temp = weather["temperature_c"]
-else:
-    months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-    def display_weather_inputs(title, key_prefix, min_val, max_val, default_val, step_val):
-        st.subheader(title)
-        values = {}
-        for i in range(0, len(months), 4):
-            cols = st.columns(4)
-            for j, col in enumerate(cols):
-                if i + j < len(months):
-                    month = months[i + j]
-                    with col:
-                        values[month] = st.number_input(
-                            f"{month}", key=f"{key_prefix}_{month}",
-                            min_value=min_val, max_value=max_val,
-                            value=default_val, step=step_val
-                        )
-        return values
-
-    monthly_rain = display_weather_inputs("☔ Rainfall (mm)", "rain", 0.0, 1000.0, 10.0, 1.0)
-    monthly_rh = display_weather_inputs("💧 Relative Humidity (%)", "rh", 0.0, 100.0, 75.0, 1.0)
-    monthly_temp = display_weather_inputs("🌡 Temperature (°C)", "temp", -10.0, 50.0, 16.0, 0.5)
-    rain = sum(monthly_rain.values())
-    rh = sum(monthly_rh.values()) / len(monthly_rh)
-    temp = sum(monthly_temp.values()) / len(monthly_temp)
-
-st.metric("Total Rainfall (mm)", rain)
-st.metric("Avg Relative Humidity (%)", rh)
-st.metric("Avg Temperature (°C)", temp)
+@st.fragment
+def weather_section():
+    with perf.fragment("weather"):
+        st.markdown("### ☔️ Environmental Conditions")
+        weather_input_mode = st.radio("Select Weather Input Mode", ["Fetch from DPIRD", "Manual Input"])
+        if weather_input_mode == "Fetch from DPIRD":
+            station_code = st.text_input("Enter DPIRD Station Code", value="ESP").strip().upper()
+            with perf.span("fetch"):
+                try:
+                    weather = get_station_weather(station_code)
+                except RuntimeError as e:
+                    weather = {"error": str(e)}
+            if "error" in weather:
+                st.warning(f"⚠️ Could not load weather data: {weather['error']}")
+                rain = rh = temp = 0
+            else:
+                rain = weather["rain_mm"]
+                rh = weather["rh_percent"]
+                temp = weather["temperature_c"]
+                if "snapshot_date" in weather:
+                    st.info(f"📴 DPIRD unreachable – using saved observations from {weather['snapshot_date']}.")
+                elif "observed_date" in weather:
+                    st.caption(f"DPIRD observations from {weather['observed_date']}.")
+        else:
+            weather, station_code = {}, None
+            months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+            def display_weather_inputs(title, key_prefix, min_val, max_val, default_val, step_val):
+                st.subheader(title)
+                values = {}
+                for i in range(0, len(months), 4):
+                    cols = st.columns(4)
+                    for j, col in enumerate(cols):
+                        if i + j < len(months):
+                            month = months[i + j]
+                            with col:
+                                values[month] = st.number_input(
+                                    f"{month}", key=f"{key_prefix}_{month}",
+                                    min_value=min_val, max_value=max_val,
+                                    value=default_val, step=step_val
+                                )
+                return values
+
+            monthly_rain = display_weather_inputs("☔ Rainfall (mm)", "rain", 0.0, 1000.0, 10.0, 1.0)
+            monthly_rh = display_weather_inputs("💧 Relative Humidity (%)", "rh", 0.0, 100.0, 75.0, 1.0)
+            monthly_temp = display_weather_inputs("🌡 Temperature (°C)", "temp", -10.0, 50.0, 16.0, 0.5)
+            rain = sum(monthly_rain.values())
+            rh = sum(monthly_rh.values()) / len(monthly_rh)
+            temp = sum(monthly_temp.values()) / len(monthly_temp)
+
+        st.metric("Total Rainfall (mm)", rain)
+        st.metric("Avg Relative Humidity (%)", rh)
+        st.metric("Avg Temperature (°C)", temp)
+
+        st.session_state.weather = {
+            "rain": rain, "rh": rh, "temp": temp,
+            "error": weather.get("error"), "station": station_code,
+        }
 
 # Seed & prior fungicide selection
-seed_dressed = st.checkbox("Seed Treated?")
-selected_seed_treatment = "None"
-if seed_dressed:
-    seed_options = [f"{name} ({data['group']} – {data['moa']})" for name, data in seed_treatment_lookup.items()]
-    selected_seed_treatment_display = st.selectbox("Select Seed Treatment", seed_options)
-    selected_seed_treatment = selected_seed_treatment_display.split(" (")[0]
-
-prior_fungicide = st.checkbox("Foliar Fungicide Applied to Date?")
-selected_prior_fungicide = "None"
-if prior_fungicide:
-    foliar_options = [f"{name} ({data['group']} – {data['moa']})" for name, data in foliar_fungicide_lookup.items()]
-    selected_prior_fungicide_display = st.selectbox("Select Prior Foliar Fungicide", foliar_options)
-    selected_prior_fungicide = selected_prior_fungicide_display.split(" (")[0]
-
-days_since_rain = st.slider("Days Since Last Rain", 0, 14, 3)
-leaf_wetness_hours = st.slider("Leaf Wetness (last 7 days)", 0, 50, 24)
-rain_days_last_week = st.slider("Rain Days Last Week", 0, 7, 3)
+@st.fragment
+def spray_history_section():
+    with perf.fragment("spray_history"):
+        seed_dressed = st.checkbox("Seed Treated?")
+        selected_seed_treatment = "None"
+        if seed_dressed:
+            seed_options = [f"{name} ({data['group']} – {data['moa']})" for name, data in seed_treatment_lookup.items()]
+            selected_seed_treatment_display = st.selectbox("Select Seed Treatment", seed_options)
+            selected_seed_treatment = selected_seed_treatment_display.split(" (")[0]
+
+        prior_fungicide = st.checkbox("Foliar Fungicide Applied to Date?")
+        selected_prior_fungicide = "None"
+        if prior_fungicide:
+            foliar_options = [f"{name} ({data['group']} – {data['moa']})" for name, data in foliar_fungicide_lookup.items()]
+            selected_prior_fungicide_display = st.selectbox("Select Prior Foliar Fungicide", foliar_options)
+            selected_prior_fungicide = selected_prior_fungicide_display.split(" (")[0]
+
+        st.session_state.spray_inputs = {
+            "seed_dressed": seed_dressed,
+            "selected_seed_treatment": selected_seed_treatment,
+            "prior_fungicide": prior_fungicide,
+            "selected_prior_fungicide": selected_prior_fungicide,
+            "days_since_rain": st.slider("Days Since Last Rain", 0, 14, 3),
+            "leaf_wetness_hours": st.slider("Leaf Wetness (last 7 days)", 0, 50, 24),
+            "rain_days_last_week": st.slider("Rain Days Last Week", 0, 7, 3),
+        }
+
+def current_user():
+    # st.user only carries an email when the app is deployed with authentication
+    try:
+        return st.user.get("email")
+    except Exception:
+        return None
 
 # --- EVALUATE BUTTON ---
-fungicide_options = []
-if st.button("🧪 Evaluate Disease Risk & Fungicide ROI"):
-    if weather_input_mode == "Fetch from DPIRD" and "error" in weather:
-        st.error("⚠️ Weather data unavailable.")
-    else:
-        if crop_type == "Canola":
-            result = assess_sclerotinia_risk(temp, rh, rain, days_since_rain, leaf_wetness_hours,
-                rain_days_last_week, seed_dressed, prior_fungicide,
-                selected_seed_treatment, selected_prior_fungicide, crop_stage)
-        elif crop_type == "Wheat":
-            result = assess_septoria_risk(temp, rh, rain, crop_stage, False,
-                seed_dressed, prior_fungicide, selected_seed_treatment, selected_prior_fungicide)
-        else:
-            result = assess_rust_risk(temp, rh, crop_stage, False,
-                seed_dressed, prior_fungicide, selected_seed_treatment, selected_prior_fungicide)
-
-        st.markdown("### ✅ Recommendation")
-        st.success(result["recommendation"])
-        st.info(f"Risk Level: **{result['risk_level']}**")
-
-        fungicide_options = result.get("fungicide_options", [])
-        if count_sdhi_uses(selected_seed_treatment, selected_prior_fungicide) >= 2:
-            fungicide_options = [
-                f for f in fungicide_options
-                if "SDHI" not in f["group"].upper() and "GROUP 7" not in f["group"].upper()
-            ]
-            st.warning("⚠️ Two SDHI applications already used. SDHI options excluded per AFREN guidelines.")
-
-        # Build table
-        table = []  # ✅ Make sure this line exists
-if disease_present:
-    fungicide_options = [
-        f for f in fungicide_options
-        if "curative" in fungicide_costs.get(f["name"], {}).get("action", "").lower()
-    ]
-
-table = []
-for f in fungicide_options:
-    name = f['name']
-    group = f['group']
-    persistence = f['persistence']
-
-    if name in fungicide_costs:
-        rate = fungicide_costs[name]["rate"]
-        cost = fungicide_costs[name]["cost_per_ha"]
-        action = fungicide_costs[name]["action"]
-        total_cost = cost + application_cost
-        be_yield = total_cost / (grain_price / 1000)
-    else:
-        rate = "-"
-        action = "-"
-        total_cost = 0
-        be_yield = "N/A"
-
-    table.append({
-        "Fungicide": name,
-        "Group": group,
-        "Persistence": persistence,
-        "Rate": rate,
-        "Mode of Action": action,
-        "Cost/ha ($)": f"${total_cost:.2f}",
-        "Break-even Yield (kg/ha)": be_yield if isinstance(be_yield, str) else f"{be_yield:.1f}"
-    })
-
-st.markdown("### 📊 Fungicide Comparison Table")
-st.dataframe(pd.DataFrame(table))
+@st.fragment
+def results_section(crop_type, crop_stage, grain_price, application_cost, disease_present):
+    with perf.fragment("results"):
+        weather = st.session_state.weather
+        inputs = st.session_state.spray_inputs
+        rain, rh, temp = weather["rain"], weather["rh"], weather["temp"]
+        seed_dressed = inputs["seed_dressed"]
+        prior_fungicide = inputs["prior_fungicide"]
+        selected_seed_treatment = inputs["selected_seed_treatment"]
+        selected_prior_fungicide = inputs["selected_prior_fungicide"]
+
+        fungicide_options = []
+        if st.button("🧪 Evaluate Disease Risk & Fungicide ROI"):
+            if weather["error"]:
+                st.error("⚠️ Weather data unavailable.")
+            else:
+                with perf.span("compute"):
+                    if crop_type == "Canola":
+                        result = assess_sclerotinia_risk(temp, rh, rain, inputs["days_since_rain"], inputs["leaf_wetness_hours"],
+                            inputs["rain_days_last_week"], seed_dressed, prior_fungicide,
+                            selected_seed_treatment, selected_prior_fungicide, crop_stage)
+                    elif crop_type == "Wheat":
+                        result = assess_septoria_risk(temp, rh, rain, crop_stage, False,
+                            seed_dressed, prior_fungicide, selected_seed_treatment, selected_prior_fungicide)
+                    else:
+                        result = assess_rust_risk(temp, rh, crop_stage, False,
+                            seed_dressed, prior_fungicide, selected_seed_treatment, selected_prior_fungicide)
+
+                st.markdown("### ✅ Recommendation")
+                st.success(result["recommendation"])
+                st.info(f"Risk Level: **{result['risk_level']}**")
+
+                fungicide_options = result.get("fungicide_options", [])
+                if count_sdhi_uses(selected_seed_treatment, selected_prior_fungicide) >= 2:
+                    fungicide_options = [
+                        f for f in fungicide_options
+                        if "SDHI" not in f["group"].upper() and "GROUP 7" not in f["group"].upper()
+                    ]
+                    st.warning("⚠️ Two SDHI applications already used. SDHI options excluded per AFREN guidelines.")
+
+                log_assessment("fungicide_decision", crop_type, crop_stage,
+                               {"temp": temp, "rh": rh, "rain": rain, "grain_price": grain_price,
+                                "application_cost": application_cost, "disease_present": disease_present, **inputs},
+                               {**result, "fungicide_options": fungicide_options},
+                               user=current_user(), station=weather.get("station"))
+
+        with perf.span("compute"):
+            table = fungicide_roi_table(fungicide_options, grain_price, application_cost, disease_present)
+
+        st.markdown("### 📊 Fungicide Comparison Table")
+        with perf.span("render"):
+            st.dataframe(pd.DataFrame(table))
+
+weather_section()
+spray_history_section()
+results_section(crop_type, crop_stage, grain_price, application_cost, disease_present)
+
+# --- RERUN TIMINGS ---
+if perf.ENABLED:
+    with st.expander("⏱ Rerun Timings"):
+        st.caption("Section reruns only re-execute their own fragment (rerun:<section>); "
+                   "full reruns re-execute the whole page (rerun).")
+        timings = [row for row in perf.session_metrics()
+                   if row["page"] == "fungicide_decision_tool" and row["span"].startswith("rerun")]
+        if timings:
+            st.dataframe(pd.DataFrame(timings), hide_index=True)
 
 st.markdown("---")
 st.caption("Developed by South Coastal Agencies")
+
+perf.end_rerun()
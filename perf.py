@@ -0,0 +1,222 @@
+"""
+Lightweight rerun timing for the Streamlit pages.
+
+    perf.start_rerun("nitrogen_budget")
+    with perf.span("fetch"):
+        weather = get_daily_weather(code, year)
+    ...
+    perf.end_rerun()
+
+    @st.fragment
+    def weather_section():
+        with perf.fragment("weather"):
+            ...
+
+Set SCA_PERF=1 to turn it on. Spans are kept three ways: the last rerun's breakdown
+and a short history per session (in st.session_state), and rolling samples per
+page and span for the whole server process, which the diagnostics page and
+the metrics file report as percentiles. A fragment's total is the span
+"rerun:<fragment>", and a rerun of just that fragment is kept as a rerun of its
+own, so full-page and fragment rerun latency can be compared. When it is off,
+span() hands back one shared no-op context manager and nothing is recorded.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+ENABLED = os.environ.get("SCA_PERF", "").lower() in ("1", "true", "yes")
+
+ROLLING_WINDOW = 500          # samples kept per page/span for the process-wide percentiles
+SESSION_WINDOW = 50           # samples kept per span, and reruns kept, per session
+PERCENTILES = (50, 90, 99)
+METRICS_PATH = os.environ.get("SCA_PERF_METRICS",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "perf_metrics.json"))
+EXPORT_INTERVAL_SECONDS = 30
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_samples = {}                 # (page, span) -> deque of milliseconds, across all sessions
+_export_lock = threading.Lock()
+_last_export = 0.0
+# The diagnostics page stays out of the sidebar unless SCA_PERF is on
+_HIDE_DIAGNOSTICS_LINK = ('<style>[data-testid="stSidebarNavLinkContainer"]:has(a[href$="/diagnostics"])'
+                          ' { display: none; }</style>')
+
+
+def _session():
+    import streamlit as st
+    return st.session_state.setdefault("_perf", {
+        "page": None,
+        "rerun_started": None,
+        "current": {},
+        "reruns": deque(maxlen=SESSION_WINDOW),
+        "spans": {},
+    })
+
+
+def _record(page, name, ms):
+    with _lock:
+        _samples.setdefault((page, name), deque(maxlen=ROLLING_WINDOW)).append(ms)
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.started) * 1000
+        session = _session()
+        # Repeated spans in one rerun (e.g. a fetch per station) add up
+        session["current"][self.name] = session["current"].get(self.name, 0.0) + ms
+        session["spans"].setdefault((session["page"], self.name), deque(maxlen=SESSION_WINDOW)).append(ms)
+        _record(session["page"], self.name, ms)
+        return False
+
+
+class _Fragment(_Span):
+    __slots__ = ("alone",)
+
+    def __init__(self, name):
+        super().__init__(f"rerun:{name}")
+
+    def __enter__(self):
+        session = _session()
+        # A fragment-only rerun skips start_rerun/end_rerun, so it opens and closes its own record
+        self.alone = session["rerun_started"] is None
+        if self.alone:
+            session["current"] = {}
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        if self.alone:
+            session = _session()
+            session["reruns"].append({"page": session["page"], "at": datetime.now().isoformat(timespec="seconds"),
+                                      **session["current"]})
+            export_metrics_if_due()
+        return False
+
+
+def span(name):
+    """
+    Time a block as a named span of the current rerun.
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Span(name)
+
+
+def fragment(name):
+    """
+    Time a whole st.fragment body as the span "rerun:<name>". When only the
+    fragment reran, its spans are recorded as a rerun of their own.
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Fragment(name)
+
+
+def start_rerun(page):
+    """
+    Call at the top of a page script. Fragment reruns skip it; wrap fragment
+    bodies in fragment() to time them. When timing is off it only hides the
+    diagnostics page's sidebar link.
+    """
+    if not ENABLED:
+        import streamlit as st
+        st.markdown(_HIDE_DIAGNOSTICS_LINK, unsafe_allow_html=True)
+        return
+    session = _session()
+    session.update(page=page, rerun_started=time.perf_counter(), current={})
+
+
+def end_rerun():
+    """
+    Call at the bottom of a page script to record the total rerun time.
+    """
+    if not ENABLED:
+        return
+    session = _session()
+    if session["rerun_started"] is None:
+        return
+    ms = (time.perf_counter() - session["rerun_started"]) * 1000
+    session["current"]["rerun"] = ms
+    session["spans"].setdefault((session["page"], "rerun"), deque(maxlen=SESSION_WINDOW)).append(ms)
+    session["reruns"].append({"page": session["page"], "at": datetime.now().isoformat(timespec="seconds"),
+                              **session["current"]})
+    session["rerun_started"] = None
+    _record(session["page"], "rerun", ms)
+    export_metrics_if_due()
+
+
+def summarise(samples):
+    """
+    {(page, span): deque of ms} -> list of rows with count and percentiles.
+    """
+    rows = []
+    for (page, name), values in sorted(samples.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        ordered = sorted(values)
+        row = {"page": page, "span": name, "count": len(ordered)}
+        for p in PERCENTILES:
+            row[f"p{p}_ms"] = round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)], 2)
+        row["max_ms"] = round(ordered[-1], 2)
+        rows.append(row)
+    return rows
+
+
+def process_samples():
+    """
+    Copy of the raw rolling samples, {(page, span): [ms, ...]}, e.g. to merge across processes.
+    """
+    with _lock:
+        return {key: list(values) for key, values in _samples.items()}
+
+
+def process_metrics():
+    return summarise(process_samples())
+
+
+def session_metrics():
+    return summarise(_session()["spans"])
+
+
+def session_reruns():
+    return list(_session()["reruns"])
+
+
+def export_metrics(path=METRICS_PATH):
+    """
+    Write the process-wide percentiles to a JSON file, replacing it atomically.
+    Sessions run on separate threads, so the temporary file is per thread too.
+    """
+    global _last_export
+    payload = {"exported": datetime.now().isoformat(timespec="seconds"), "pid": os.getpid(),
+               "window": ROLLING_WINDOW, "spans": process_metrics()}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _export_lock:
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+        _last_export = time.monotonic()
+    return path
+
+
+def export_metrics_if_due():
+    # Claim the slot under the lock so concurrent reruns don't all export at once
+    global _last_export
+    with _export_lock:
+        if time.monotonic() - _last_export < EXPORT_INTERVAL_SECONDS:
+            return
+        _last_export = time.monotonic()
+    export_metrics()
@@ -0,0 +1,112 @@
+import json
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from dpird_weather_fetcher import fetch_daily_weather
+
+# Monthly totals are cached on disk as one JSON file per station and year
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache", "rainfall")
+
+# Number of completed years averaged for the long-term monthly means
+LONG_TERM_YEARS = 10
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def _cache_path(code, year):
+    return os.path.join(CACHE_DIR, f"{code}_{year}.json")
+
+
+def _load_record(code, year):
+    try:
+        with open(_cache_path(code, year)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_record(record):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(record["station"], record["year"])
+    # Write then rename so a concurrent reader never sees a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+
+def monthly_totals(daily_rain):
+    """
+    Sum a daily rainfall Series (DatetimeIndex) into {"Jan": mm, ...}.
+    """
+    totals = daily_rain.groupby(daily_rain.index.month).sum()
+    return {month: float(totals.get(i + 1, 0.0)) for i, month in enumerate(MONTHS)}
+
+
+def get_monthly_rainfall(code, year=None, today=None):
+    """
+    Monthly rainfall totals for a station and calendar year as a record:
+    {"station", "year", "monthly": {"Jan": mm, ...}, "through": "YYYY-MM-DD", "complete": bool},
+    where through is the last day with a reading. Completed years are served from
+    the disk cache. Otherwise only the days after the last fetched one are fetched
+    and added to the month-to-date totals, along with any earlier days that had no
+    reading yet ("missing") and have one now.
+    """
+    today = today or date.today()
+    year = year or today.year
+    code = code.strip().upper()
+
+    record = _load_record(code, year)
+    if record and record["complete"]:
+        return record
+    if record is None:
+        record = {"station": code, "year": year, "monthly": dict.fromkeys(MONTHS, 0.0),
+                  "through": None, "complete": False}
+    # Records cached before fetched/missing were tracked stop at their last reading
+    fetched = record.get("fetched", record["through"])
+    missing = set(record.get("missing", []))
+
+    start = None
+    if fetched:
+        start = min([date.fromisoformat(fetched) + timedelta(days=1), *map(date.fromisoformat, missing)])
+    if start is None or start <= min(today, date(year, 12, 31)):
+        days = fetch_daily_weather(code, year, start=start, variables=("rain_mm",))["rain_mm"]
+        days = days[days.index.year == year]
+        dates = days.index.strftime("%Y-%m-%d")
+        new = days[(dates > (fetched or "")) | dates.isin(missing)]
+        if not new.empty:
+            observed = new.dropna()
+            for month, total in monthly_totals(observed).items():
+                record["monthly"][month] += total
+            missing = (missing - set(observed.index.strftime("%Y-%m-%d"))) | \
+                set(new[new.isna()].index.strftime("%Y-%m-%d"))
+            fetched = max(fetched or "", dates.max())
+            if not observed.empty:
+                record["through"] = max(record["through"] or "", observed.index.max().date().isoformat())
+
+    record["fetched"], record["missing"] = fetched, sorted(missing)
+    # A past year is final once a fetch has reached Dec 31, even if that day has no reading
+    record["complete"] = year < today.year and fetched == date(year, 12, 31).isoformat()
+    _save_record(record)
+    return record
+
+
+def get_long_term_monthly_means(code, years=LONG_TERM_YEARS, end_year=None, today=None):
+    """
+    Mean monthly rainfall over the `years` completed years before end_year
+    (default: the current year). Years DPIRD cannot supply are skipped.
+    """
+    today = today or date.today()
+    end_year = end_year or today.year
+    monthly = []
+    errors = []
+    for year in range(end_year - years, end_year):
+        try:
+            monthly.append(get_monthly_rainfall(code, year, today)["monthly"])
+        except Exception as e:
+            errors.append(f"{year}: {e}")
+    if not monthly:
+        raise RuntimeError(f"No rainfall history available for {code} ({'; '.join(errors)})")
+    return pd.DataFrame(monthly)[MONTHS].mean().round(1).to_dict()
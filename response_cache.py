@@ -0,0 +1,86 @@
+"""
+On-disk cache of chat assistant answers to standalone questions.
+
+Entries are keyed by the normalised question, the model and the system prompt
+version, so editing the prompt never serves stale answers. Entries expire after
+CACHE_TTL_SECONDS, and the least recently used are evicted beyond MAX_ENTRIES.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache", "chat_responses")
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+MAX_ENTRIES = 500
+
+
+def prompt_version(system_prompt):
+    return hashlib.sha256(system_prompt.encode()).hexdigest()[:12]
+
+
+def normalise_question(question):
+    """
+    Lower-case, turn punctuation into spaces and collapse whitespace, so "Z39 cutoff
+    for Aviator Xpro?" and "z39 cutoff for  aviator xpro" share an entry. Decimal
+    points, %, + and hyphens are kept.
+    """
+    question = re.sub(r"[^\w\s%+.-]", " ", question.lower())
+    question = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", question)
+    return " ".join(question.split())
+
+
+def _cache_path(question, version, model):
+    key = hashlib.sha256(f"{version}\n{model}\n{normalise_question(question)}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def get_cached_response(question, version, model, now=None):
+    path = _cache_path(question, version, model)
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (now or time.time()) - entry["created"] > CACHE_TTL_SECONDS:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    # Touch so eviction is least recently used, not least recently written
+    os.utime(path)
+    return entry["response"]
+
+
+def store_response(question, version, model, response, now=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(question, version, model)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"question": question, "version": version, "model": model,
+                   "created": now or time.time(), "response": response}, f)
+    os.replace(tmp_path, path)
+    evict_entries()
+
+
+def evict_entries(max_entries=MAX_ENTRIES):
+    """
+    Remove the least recently used entries beyond max_entries.
+    """
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".json")]
+    except OSError:
+        return 0
+    if len(entries) <= max_entries:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    removed = 0
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,126 @@
+"""
+BM25 retrieval over the fungicide product tables, crop guidance and AFREN rules,
+used to ground the chat assistant's answers in the app's own data.
+
+    for score, doc in search("aviator xpro rate for yellow spot"):
+        print(doc["source"], doc["text"])
+
+The index is a plain inverted index, term -> [(document, term frequency)], built
+once per process on first use. A query only scores the documents that share a
+term with it, so a search over the whole corpus takes well under a millisecond.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from afren_rules import AFREN_RULES
+from fungicide_info import APPLICATION_TIPS, FUNGICIDE_GUIDANCE
+from fungicide_products import foliar_fungicide_lookup, fungicide_costs, seed_treatment_lookup
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_K = 4
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i if in is it its my of on or should
+the this to use used using what when which will with
+""".split())
+
+
+def tokenize(text):
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        # Crude plural folding so "sprays" matches "spray"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+# --- Corpus ---
+def _product_documents():
+    documents = []
+    for name, data in seed_treatment_lookup.items():
+        if name != "None":
+            documents.append(f"{name}: seed treatment, {data['group']} ({data['moa']}).")
+    for name in sorted(set(foliar_fungicide_lookup) | set(fungicide_costs)):
+        if name == "None":
+            continue
+        text = f"{name}: foliar fungicide"
+        if name in foliar_fungicide_lookup:
+            data = foliar_fungicide_lookup[name]
+            text += f", {data['group']} ({data['moa']})"
+        if name in fungicide_costs:
+            data = fungicide_costs[name]
+            text += f". Rate {data['rate']}, about ${data['cost_per_ha']}/ha, {data['action']}"
+        documents.append(text + ".")
+    return documents
+
+
+def corpus():
+    """
+    Every indexed snippet as {"source", "text"}.
+    """
+    documents = [{"source": "product", "text": text} for text in _product_documents()]
+    for crop, guidance in FUNGICIDE_GUIDANCE.items():
+        for option in guidance["options"]:
+            documents.append({"source": "guidance", "text": f"{crop} ({guidance['disease']}): {option}"})
+    documents += [{"source": "guidance", "text": f"Application tip: {tip}"} for tip in APPLICATION_TIPS]
+    documents += [{"source": "afren", "text": f"AFREN rule: {rule}"} for rule in AFREN_RULES]
+    return documents
+
+
+# --- Index ---
+def build_index(documents):
+    postings = {}
+    lengths = []
+    for doc_id, doc in enumerate(documents):
+        terms = Counter(tokenize(doc["text"]))
+        lengths.append(sum(terms.values()))
+        for term, count in terms.items():
+            postings.setdefault(term, []).append((doc_id, count))
+    n = len(documents)
+    idf = {term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in postings.items()}
+    return {"documents": documents, "postings": postings, "idf": idf, "lengths": lengths,
+            "avg_length": sum(lengths) / max(n, 1)}
+
+
+@lru_cache(maxsize=1)
+def default_index():
+    return build_index(corpus())
+
+
+def search(query, k=DEFAULT_TOP_K, index=None):
+    """
+    The k best matching documents for a query as (score, document), best first.
+    """
+    index = index or default_index()
+    lengths, avg_length = index["lengths"], index["avg_length"]
+    scores = {}
+    for term in set(tokenize(query)):
+        idf = index["idf"].get(term)
+        if idf is None:
+            continue
+        for doc_id, count in index["postings"][term]:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (BM25_K1 + 1) / (count + norm)
+    best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+    return [(score, index["documents"][doc_id]) for doc_id, score in best]
+
+
+def grounding_message(query, k=DEFAULT_TOP_K):
+    """
+    A system message carrying the top snippets for the query, or None if nothing matches.
+    """
+    results = search(query, k)
+    if not results:
+        return None
+    notes = "\n".join(f"- {doc['text']}" for _, doc in results)
+    return {"role": "system",
+            "content": "Reference notes from the app's product table, crop guidance and AFREN rules. "
+                       "Base product, rate and resistance advice on these; say so if they don't cover "
+                       f"the question.\n{notes}"}
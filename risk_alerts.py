@@ -0,0 +1,158 @@
+"""
+Incremental risk-change alerts for a whole paddock register.
+
+    python risk_alerts.py register.csv
+    python risk_alerts.py register.parquet --outbox alerts.jsonl --interpolate
+
+After each weather sync, only paddocks whose scoring inputs (register columns and
+weather) changed since the last run are re-scored. Each new risk level is compared
+with the stored one, and an alert is queued in the outbox only when risk goes up,
+e.g. Moderate -> High. The outbox is a JSON-lines file that consumers empty with
+drain_outbox(); the last known state per paddock is kept in a JSON file beside it.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from morning_risk_report import WEATHER_COLUMNS, load_scoring_register, score_register
+from paddock_scoring import REGISTER_DEFAULTS, RISK_RANK
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+STATE_PATH = os.path.join(CACHE_DIR, "risk_state.json")
+OUTBOX_PATH = os.path.join(CACHE_DIR, "alerts_outbox.jsonl")
+FINGERPRINT_COLUMNS = list(REGISTER_DEFAULTS) + list(WEATHER_COLUMNS)
+
+
+# --- State ---
+def load_state(path=STATE_PATH):
+    """
+    {paddock_id (str): {"fingerprint", "risk_level", "disease", "scored_at"}}; empty on first run.
+    risk_level is the last known level, so a run with missing weather (Unknown) doesn't replace it.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)["paddocks"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_state(paddocks, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated": datetime.now().isoformat(timespec="seconds"), "paddocks": paddocks}, f)
+    os.replace(tmp_path, path)
+
+
+def fingerprints(register):
+    """
+    One hash per register row over everything that feeds the score, as hex strings.
+    """
+    columns = [col for col in FINGERPRINT_COLUMNS if col in register.columns]
+    hashes = pd.util.hash_pandas_object(register[columns], index=False)
+    return hashes.map("{:016x}".format)
+
+
+# --- Outbox ---
+def append_alerts(alerts, path=OUTBOX_PATH):
+    if not alerts:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One write per batch so a concurrent drain never sees half a batch
+    with open(path, "a") as f:
+        f.write("".join(json.dumps(alert) + "\n" for alert in alerts))
+
+
+def drain_outbox(path=OUTBOX_PATH):
+    """
+    Take every queued alert, leaving the outbox empty. Alerts queued while draining
+    land in a fresh outbox and are picked up next time.
+    """
+    draining = f"{path}.{os.getpid()}.draining"
+    try:
+        os.replace(path, draining)
+    except FileNotFoundError:
+        return []
+    with open(draining) as f:
+        alerts = [json.loads(line) for line in f if line.strip()]
+    os.remove(draining)
+    return alerts
+
+
+# --- Engine ---
+def is_escalation(previous_level, new_level):
+    # Unknown means weather was missing, so recovering from it is not an escalation
+    if previous_level in (None, "Unknown") or new_level == "Unknown":
+        return False
+    return RISK_RANK[new_level] > RISK_RANK[previous_level]
+
+
+def check_for_alerts(register, state, workers=None, now=None):
+    """
+    Re-score the register rows whose fingerprint changed and return
+    (updated state, alerts, number re-scored). Paddocks no longer in the
+    register are dropped from the state.
+    """
+    now = (now or datetime.now()).isoformat(timespec="seconds")
+    register = register.assign(_fingerprint=fingerprints(register).to_numpy())
+    ids = register["paddock_id"].astype(str)
+    previous = ids.map(lambda pid: state.get(pid, {}).get("fingerprint"))
+    changed = register[register["_fingerprint"].to_numpy() != previous.to_numpy()]
+    fingerprint_by_id = dict(zip(changed["paddock_id"].astype(str), changed["_fingerprint"]))
+
+    updated = {pid: state[pid] for pid in ids if pid in state}
+    alerts = []
+    for chunk in score_register(changed.drop(columns="_fingerprint"), workers):
+        for result in chunk:
+            pid = str(result["paddock_id"])
+            before = state.get(pid, {})
+            if is_escalation(before.get("risk_level"), result["risk_level"]):
+                alerts.append({
+                    "alert_id": uuid.uuid4().hex,
+                    "created": now,
+                    "paddock_id": result["paddock_id"],
+                    "crop": result["crop"],
+                    "crop_stage": result["crop_stage"],
+                    "station": result["station"],
+                    "disease": result.get("disease"),
+                    "from_level": before["risk_level"],
+                    "to_level": result["risk_level"],
+                    "recommendation": result["recommendation"],
+                })
+            # Keep comparing against the last known level through days with missing weather
+            level = before.get("risk_level") if result["risk_level"] == "Unknown" and before else result["risk_level"]
+            updated[pid] = {"fingerprint": fingerprint_by_id[pid], "risk_level": level,
+                            "disease": result.get("disease"), "scored_at": now}
+    return updated, alerts, len(changed)
+
+
+def run_alerts(register_path, state_path=STATE_PATH, outbox_path=OUTBOX_PATH, workers=None, interpolate=False):
+    register = load_scoring_register(register_path, interpolate=interpolate)
+    state, alerts, rescored = check_for_alerts(register, load_state(state_path), workers)
+    # Queue alerts before saving state, so a crash in between repeats alerts rather than losing them
+    append_alerts(alerts, outbox_path)
+    save_state(state, state_path)
+    return len(register), rescored, alerts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("register", help="Paddock register (.csv or .parquet)")
+    parser.add_argument("--state", default=STATE_PATH, help="Last known risk per paddock")
+    parser.add_argument("--outbox", default=OUTBOX_PATH, help="JSON-lines file alerts are appended to")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--interpolate", action="store_true",
+                        help="Interpolate weather at paddock coordinates from the DPIRD grid")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total, rescored, alerts = run_alerts(args.register, args.state, args.outbox, args.workers, args.interpolate)
+    print(f"Re-scored {rescored:,} of {total:,} paddocks in {time.perf_counter() - started:.1f} s; "
+          f"{len(alerts)} risk increases queued in {args.outbox}")
+    for alert in alerts[:20]:
+        print(f"  {alert['paddock_id']}: {alert['from_level']} -> {alert['to_level']} ({alert['disease']})")
@@ -0,0 +1,210 @@
+"""
+Local HTTP/JSON service for the disease risk, blackleg, AFREN and nitrogen engines.
+
+    python risk_service.py --port 8600 --workers 4
+
+POST a single object or {"items": [...]} to /v1/<engine>, where engine is one of
+sclerotinia, septoria, rust, blackleg, afren or nitrogen. Each object holds the keyword
+arguments of the matching engine function. Batches larger than --stream-threshold
+are streamed back as newline-delimited JSON ({"index": i, "result": {...}} per line)
+in request order; smaller batches return {"results": [...]}. Batch items an engine
+can't score get {"error": ...} in place of their result; a single object that can't
+be scored gets a 422 with {"error": ...}. If a whole chunk fails (e.g. a worker
+dies) the response is a 500, or for a stream a final {"index", "error"} line.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from afren_rules import check_afren_compliance
+from assess_disease_risks import assess_rust_risk, assess_sclerotinia_risk, assess_septoria_risk
+from blackleg_risk_tool import evaluate_blackleg_risk
+from nitrogen_engine import evaluate_paddocks
+
+# Items handed to a worker in one go; big enough to amortise pool overhead
+CHUNK_SIZE = 250
+STREAM_THRESHOLD = 1000
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+
+def _nitrogen_batch(items):
+    # The nitrogen engine is vectorised, so a chunk is budgeted as one DataFrame
+    paddocks = pd.DataFrame(items)
+    paddocks = paddocks.rename(columns={"ammonia": "ammonium"})
+    outputs = evaluate_paddocks(paddocks).drop(columns=paddocks.columns)
+    # NaN/inf (e.g. break-even at a zero grain price) are sent as null
+    outputs = outputs.replace([np.inf, -np.inf], np.nan).astype(object)
+    return outputs.where(outputs.notna(), None).to_dict("records")
+
+
+ENGINES = {
+    "sclerotinia": lambda item: assess_sclerotinia_risk(**item),
+    "septoria": lambda item: assess_septoria_risk(**item),
+    "rust": lambda item: assess_rust_risk(**item),
+    "blackleg": evaluate_blackleg_risk,
+    "afren": lambda item: {"warnings": check_afren_compliance(**item)},
+}
+BATCH_ENGINES = {
+    "nitrogen": _nitrogen_batch,
+}
+
+
+def run_chunk(engine, items):
+    """
+    Score one chunk of items in a worker. Bad items get an {"error": ...} result
+    instead of failing the whole batch.
+    """
+    if engine in BATCH_ENGINES:
+        try:
+            return BATCH_ENGINES[engine](items)
+        except Exception as e:
+            if len(items) == 1:
+                return [{"error": f"{type(e).__name__}: {e}"}]
+            # Fall back to one item at a time to isolate the bad rows
+            return [result for item in items for result in run_chunk(engine, [item])]
+
+    results = []
+    for item in items:
+        try:
+            results.append(ENGINES[engine](item))
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def dumps(value):
+    return json.dumps(value, default=_json_default)
+
+
+class RiskServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pool = None
+    stream_threshold = STREAM_THRESHOLD
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "engines": sorted([*ENGINES, *BATCH_ENGINES])})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        engine = self.path.rstrip("/").rsplit("/", 1)[-1]
+        if not self.path.startswith("/v1/") or (engine not in ENGINES and engine not in BATCH_ENGINES):
+            self._send_json(404, {"error": f"Unknown engine path {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        single = isinstance(payload, dict) and "items" not in payload
+        items = [payload] if single else payload.get("items") if isinstance(payload, dict) else None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            self._send_json(400, {"error": 'Body must be an object or {"items": [objects]}'})
+            return
+
+        chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+        futures = [self.pool.submit(run_chunk, engine, chunk) for chunk in chunks]
+
+        if single or len(items) <= self.stream_threshold:
+            try:
+                results = [result for future in futures for result in future.result()]
+            except Exception as e:
+                # e.g. a worker process died; answer rather than dropping the connection
+                self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            if single:
+                # A lone object that can't be scored is the request's failure, not an in-band result
+                failed = isinstance(results[0], dict) and set(results[0]) == {"error"}
+                self._send_json(422 if failed else 200, results[0])
+            else:
+                self._send_json(200, {"results": results})
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            index = 0
+            for future in futures:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # Headers are already sent, so end the stream with an error line
+                    self._write_chunk((dumps({"index": index, "error": f"{type(e).__name__}: {e}"}) + "\n").encode())
+                    break
+                lines = []
+                for result in results:
+                    lines.append(dumps({"index": index, "result": result}))
+                    index += 1
+                self._write_chunk(("\n".join(lines) + "\n").encode())
+            self._write_chunk(b"")
+
+
+def make_server(host="127.0.0.1", port=8600, workers=None, executor="process",
+                stream_threshold=STREAM_THRESHOLD, verbose=False):
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    handler = type("Handler", (RiskServiceHandler,), {
+        "pool": pool_class(max_workers=workers or os.cpu_count()),
+        "stream_threshold": stream_threshold,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=None, help="Worker pool size (default: all cores)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process",
+                        help="Process pool sidesteps the GIL for the pure-Python engines")
+    parser.add_argument("--stream-threshold", type=int, default=STREAM_THRESHOLD,
+                        help="Batches larger than this are streamed as NDJSON")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.executor, args.stream_threshold, args.verbose)
+    print(f"Risk service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.pool.shutdown()
@@ -0,0 +1,211 @@
+"""
+Cache shared by every app process on a host, so several Streamlit workers behind
+a load balancer warm one copy of weather fetches and derived tables instead of
+one each.
+
+    @shared_cached("station_weather", ttl=30 * 60)
+    def get_station_weather(code): ...
+
+Entries live in one SQLite database in WAL mode: readers never block each other
+or the writer, each write is a single transaction (so readers see the old value
+or the new one, never half), and SQLite's file locks serialise writers across
+processes. When the database grows past MAX_BYTES the least recently used
+entries are evicted. A missing entry is computed by one process at a time; the
+others wait for its result rather than all fetching from DPIRD at once.
+
+Values are pickled, so only point SCA_SHARED_CACHE_PATH at a file this app owns.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.environ.get("SCA_SHARED_CACHE_PATH",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "shared_cache.sqlite3"))
+MAX_BYTES = 256 * 1024 * 1024
+# Eviction trims to this fraction of MAX_BYTES so it doesn't run on every write
+EVICT_TO_FRACTION = 0.8
+# Last-access times are only rewritten when older than this, to keep hits read-only
+ACCESS_RESOLUTION_SECONDS = 60
+# How long a process may hold the right to compute a missing entry before others take over
+COMPUTE_LEASE_SECONDS = 120
+LEASE_POLL_SECONDS = 0.1
+BUSY_TIMEOUT_MS = 10_000
+
+MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+_local = threading.local()
+
+
+def connect(path=None):
+    """
+    This thread's connection to the cache at path (default CACHE_PATH, looked up
+    at call time so tests can point it elsewhere), opened on first use and again
+    after a fork, since SQLite connections can't be shared across processes.
+    """
+    path = path or CACHE_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+    if path not in connections:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly where needed
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        connections[path] = conn
+    return connections[path]
+
+
+def make_key(*args, **kwargs):
+    return hashlib.sha256(repr((args, sorted(kwargs.items()))).encode()).hexdigest()
+
+
+def get(namespace, key, path=None, now=None):
+    """
+    The cached value, or MISSING if absent or expired.
+    """
+    now = now or time.time()
+    conn = connect(path)
+    row = conn.execute("SELECT value, expires, accessed FROM entries WHERE namespace = ? AND key = ?",
+                       (namespace, key)).fetchone()
+    if row is None or (row[1] is not None and row[1] <= now):
+        return MISSING
+    if now - row[2] > ACCESS_RESOLUTION_SECONDS:
+        conn.execute("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+    return pickle.loads(row[0])
+
+
+def put(namespace, key, value, ttl=None, path=None, max_bytes=MAX_BYTES, now=None):
+    """
+    Store value under (namespace, key), replacing any old value, and evict
+    least recently used entries if the cache is over max_bytes.
+    """
+    now = now or time.time()
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    conn = connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                     (namespace, key, blob, len(blob), now + ttl if ttl else None, now))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > max_bytes:
+            _evict(conn, total - int(max_bytes * EVICT_TO_FRACTION), now)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _evict(conn, excess, now):
+    # Expired entries go first, then the least recently used
+    freed = 0
+    rows = conn.execute("SELECT namespace, key, size FROM entries "
+                        "ORDER BY (expires IS NOT NULL AND expires <= ?) DESC, accessed", (now,))
+    victims = []
+    for namespace, key, size in rows:
+        if freed >= excess:
+            break
+        victims.append((namespace, key))
+        freed += size
+    conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+
+def clear(namespace=None, path=None):
+    conn = connect(path)
+    if namespace is None:
+        conn.execute("DELETE FROM entries")
+    else:
+        conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+
+def stats(path=None):
+    """
+    {namespace: (entries, bytes)}.
+    """
+    rows = connect(path).execute("SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace")
+    return {namespace: (count, size) for namespace, count, size in rows}
+
+
+# --- Single-flight computation ---
+def _acquire_lease(conn, namespace, key, holder, now):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND expires <= ?", (namespace, key, now))
+        acquired = conn.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?)",
+                                (namespace, key, holder, now + COMPUTE_LEASE_SECONDS)).rowcount == 1
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return acquired
+
+
+def _release_lease(conn, namespace, key, holder):
+    conn.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND holder = ?", (namespace, key, holder))
+
+
+def get_or_compute(namespace, key, compute, ttl=None, path=None):
+    """
+    The cached value, or compute() stored for the next caller. While one process
+    or thread is computing a key, others asking for it wait for its result; if it
+    fails or takes longer than COMPUTE_LEASE_SECONDS they compute it themselves.
+    Exceptions from compute are raised and not cached.
+    """
+    value = get(namespace, key, path)
+    if value is not MISSING:
+        return value
+    conn = connect(path)
+    holder = f"{os.getpid()}:{threading.get_ident()}"
+    while not _acquire_lease(conn, namespace, key, holder, time.time()):
+        time.sleep(LEASE_POLL_SECONDS)
+        value = get(namespace, key, path)
+        if value is not MISSING:
+            return value
+    try:
+        # Another process may have finished between our miss and taking the lease
+        value = get(namespace, key, path)
+        if value is MISSING:
+            value = compute()
+            put(namespace, key, value, ttl, path)
+        return value
+    finally:
+        _release_lease(conn, namespace, key, holder)
+
+
+def shared_cached(namespace, ttl=None, path=None):
+    """
+    Decorator caching a function's results in the shared cache, keyed on its
+    arguments (which must have a stable repr, as str, numbers and dates do).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(namespace, make_key(*args, **kwargs), lambda: func(*args, **kwargs), ttl, path)
+        return wrapper
+    return decorator
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+# --- Model parameters (indicative, South Coast WA sandy duplex soils) ---
+# Fraction of organic N mineralised per day at 25°C and a full profile. Calibrated so an
+# average season reproduces the old flat 3% of the organic pool.
+BASE_MINERALISATION_RATE = 0.0006
+Q10 = 2.0                          # mineralisation rate doubles per 10°C
+REFERENCE_TEMP_C = 25.0
+BUCKET_CAPACITY_MM = 100.0         # plant-available water held in the root zone
+INITIAL_SOIL_WATER_FRACTION = 0.3  # profile fill at the start of the season
+ET_MM_PER_DEGREE = 0.15            # daily evapotranspiration per °C of mean temperature
+MIN_ET_MM = 0.5
+MIN_MOISTURE_FACTOR = 0.1          # mineralisation never fully stops in a dry profile
+LEACHING_EFFICIENCY = 0.5          # share of nitrate in draining water that leaves the root zone
+
+# Crop N uptake follows a logistic curve over thermal time (°C days from sowing)
+UPTAKE_BASE_TEMP_C = 0.0
+UPTAKE_MIDPOINT_CD = 1000.0
+UPTAKE_SPREAD_CD = 150.0
+
+# Season-total leaching loss (kg N/ha) at which the risk rating steps up
+LEACHING_RISK_THRESHOLDS = {"High": 20.0, "Moderate": 5.0}
+
+# --- Season window and climatology used to fill days not yet observed ---
+SEASON_START = (4, 1)   # 1 April
+SEASON_END = (10, 31)   # 31 October
+MONTHLY_MEAN_RAIN_MM = {
+    "Jan": 24.0, "Feb": 24.0, "Mar": 32.0, "Apr": 45.0, "May": 75.0, "Jun": 85.0,
+    "Jul": 95.0, "Aug": 85.0, "Sep": 60.0, "Oct": 45.0, "Nov": 33.0, "Dec": 22.0
+}
+MONTHLY_MEAN_TEMP_C = {
+    "Jan": 20.5, "Feb": 20.8, "Mar": 19.6, "Apr": 17.3, "May": 14.9, "Jun": 12.9,
+    "Jul": 12.0, "Aug": 12.5, "Sep": 13.8, "Oct": 15.4, "Nov": 17.3, "Dec": 19.1
+}
+
+STATE_ARRAYS = ("mineral_n", "organic_n", "n_demand", "soil_water", "thermal_time",
+                "mineralised", "leached", "uptake", "drainage")
+
+
+def init_soil_n_state(initial_mineral_n, organic_n, n_demand, soil_water=None):
+    """
+    Start-of-season state for one or more paddocks. Arguments are kg/ha (soil water in mm)
+    and may be scalars or arrays with one value per paddock.
+    """
+    initial_mineral_n, organic_n, n_demand = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(initial_mineral_n, dtype=float)),
+        np.atleast_1d(np.asarray(organic_n, dtype=float)),
+        np.atleast_1d(np.asarray(n_demand, dtype=float)),
+    )
+    zeros = np.zeros_like(initial_mineral_n)
+    if soil_water is None:
+        soil_water = BUCKET_CAPACITY_MM * INITIAL_SOIL_WATER_FRACTION
+    return {
+        "day": 0,
+        "mineral_n": initial_mineral_n.copy(),
+        "organic_n": organic_n.copy(),
+        "n_demand": n_demand.copy(),
+        "soil_water": zeros + soil_water,
+        "thermal_time": zeros.copy(),
+        "mineralised": zeros.copy(),
+        "leached": zeros.copy(),
+        "uptake": zeros.copy(),
+        "drainage": zeros.copy(),
+    }
+
+
+def _uptake_fraction(thermal_time):
+    return 1 / (1 + np.exp(-(thermal_time - UPTAKE_MIDPOINT_CD) / UPTAKE_SPREAD_CD))
+
+
+def advance_soil_n(state, rain_mm, temperature_c):
+    """
+    Step the state forward one day per weather row and return (new_state, daily).
+    rain_mm and temperature_c are (days,) for a shared station or (days, paddocks).
+    daily holds (days, paddocks) arrays of mineral N and leaching for charting.
+    The input state is not modified, so a stored state can be advanced again as
+    new weather days arrive.
+    """
+    n_paddocks = state["mineral_n"].shape[0]
+    rain = np.asarray(rain_mm, dtype=float)
+    temp = np.asarray(temperature_c, dtype=float)
+    if rain.ndim == 1:
+        rain = rain[:, None]
+    if temp.ndim == 1:
+        temp = temp[:, None]
+    n_days = rain.shape[0]
+    rain = np.broadcast_to(np.nan_to_num(rain), (n_days, n_paddocks))
+    temp = np.broadcast_to(np.nan_to_num(temp), (n_days, n_paddocks))
+
+    new_state = {key: state[key].copy() for key in STATE_ARRAYS}
+    new_state["day"] = state["day"] + n_days
+    mineral_n = new_state["mineral_n"]
+    organic_n = new_state["organic_n"]
+    soil_water = new_state["soil_water"]
+    thermal_time = new_state["thermal_time"]
+
+    daily = {
+        "mineral_n": np.empty((n_days, n_paddocks)),
+        "leached": np.empty((n_days, n_paddocks)),
+    }
+
+    for day in range(n_days):
+        # --- Water balance ---
+        et = np.maximum(temp[day] * ET_MM_PER_DEGREE, MIN_ET_MM)
+        soil_water += rain[day]
+        drainage = np.maximum(soil_water - BUCKET_CAPACITY_MM, 0)
+        soil_water -= drainage
+        soil_water[:] = np.maximum(soil_water - et, 0)
+
+        # --- Mineralisation ---
+        temp_factor = Q10 ** ((temp[day] - REFERENCE_TEMP_C) / 10)
+        moisture_factor = np.clip(soil_water / BUCKET_CAPACITY_MM, MIN_MOISTURE_FACTOR, 1)
+        mineralised = organic_n * BASE_MINERALISATION_RATE * temp_factor * moisture_factor
+        organic_n -= mineralised
+        mineral_n += mineralised
+
+        # --- Leaching (nitrate moves with drainage below the root zone) ---
+        leached = mineral_n * LEACHING_EFFICIENCY * drainage / (BUCKET_CAPACITY_MM + drainage)
+        mineral_n -= leached
+
+        # --- Crop uptake ---
+        previous_fraction = _uptake_fraction(thermal_time)
+        thermal_time += np.maximum(temp[day] - UPTAKE_BASE_TEMP_C, 0)
+        demand = new_state["n_demand"] * (_uptake_fraction(thermal_time) - previous_fraction)
+        uptake = np.minimum(demand, mineral_n)
+        mineral_n -= uptake
+
+        new_state["mineralised"] += mineralised
+        new_state["leached"] += leached
+        new_state["uptake"] += uptake
+        new_state["drainage"] += drainage
+        daily["mineral_n"][day] = mineral_n
+        daily["leached"][day] = leached
+
+    return new_state, daily
+
+
+def leaching_risk(leached_n):
+    leached_n = np.asarray(leached_n, dtype=float)
+    return np.where(leached_n >= LEACHING_RISK_THRESHOLDS["High"], "High",
+                    np.where(leached_n >= LEACHING_RISK_THRESHOLDS["Moderate"], "Moderate", "Low"))
+
+
+def summarise_soil_n(state):
+    """
+    Season totals per paddock (kg N/ha, drainage in mm) as a dict of arrays.
+    """
+    return {
+        "mineralised_n": state["mineralised"],
+        "leached_n": state["leached"],
+        "crop_uptake_n": state["uptake"],
+        "mineral_n_remaining": state["mineral_n"],
+        "drainage_mm": state["drainage"],
+        "leaching_risk": leaching_risk(state["leached"]),
+    }
+
+
+def season_dates(year):
+    return pd.date_range(pd.Timestamp(year, *SEASON_START), pd.Timestamp(year, *SEASON_END), freq="D")
+
+
+def season_weather(year, observed=None, monthly_rain=None):
+    """
+    Daily rain_mm / temperature_c for the growing season of a year.
+    Observed daily rows (e.g. from fetch_daily_weather) are used where available;
+    remaining days are filled from monthly_rain (defaults to MONTHLY_MEAN_RAIN_MM)
+    spread evenly across each month, and MONTHLY_MEAN_TEMP_C.
+    """
+    monthly_rain = monthly_rain or MONTHLY_MEAN_RAIN_MM
+    dates = season_dates(year)
+    months = dates.strftime("%b")
+    weather = pd.DataFrame({
+        "rain_mm": [monthly_rain.get(m, 0.0) for m in months] / dates.days_in_month.to_numpy(),
+        "temperature_c": [MONTHLY_MEAN_TEMP_C[m] for m in months],
+    }, index=dates)
+
+    if observed is not None and not observed.empty:
+        observed = observed.reindex(dates)[["rain_mm", "temperature_c"]]
+        weather = observed.fillna(weather)
+    return weather
+
+
+def simulate_season(initial_mineral_n, organic_n, n_demand, rain_mm, temperature_c):
+    """
+    Run a whole season from the start-of-season state and return summarise_soil_n output.
+    """
+    state = init_soil_n_state(initial_mineral_n, organic_n, n_demand)
+    state, _ = advance_soil_n(state, rain_mm, temperature_c)
+    return summarise_soil_n(state)
+
+
+def simulate_paddocks(paddocks, station_weather):
+    """
+    Season simulation for a DataFrame of paddocks in one vectorised run.
+    paddocks needs station, initial_mineral_n, organic_n and n_demand columns;
+    station_weather maps station code -> daily DataFrame from season_weather().
+    Returns the summary as a DataFrame aligned to paddocks.index.
+    """
+    stations = sorted(paddocks["station"].unique())
+    missing = [code for code in stations if code not in station_weather]
+    if missing:
+        raise ValueError(f"No weather supplied for stations: {', '.join(missing)}")
+
+    rain = np.column_stack([station_weather[code]["rain_mm"].to_numpy() for code in stations])
+    temp = np.column_stack([station_weather[code]["temperature_c"].to_numpy() for code in stations])
+    station_idx = pd.Index(stations).get_indexer(paddocks["station"])
+
+    summary = simulate_season(paddocks["initial_mineral_n"].to_numpy(), paddocks["organic_n"].to_numpy(),
+                              paddocks["n_demand"].to_numpy(), rain[:, station_idx], temp[:, station_idx])
+    return pd.DataFrame(summary, index=paddocks.index)
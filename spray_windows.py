@@ -0,0 +1,194 @@
+"""
+Spray-window planner: finds the hours in an hourly forecast that suit spraying each
+paddock's candidate fungicides and ranks them against the paddock's disease risk.
+
+    python spray_windows.py forecast.csv action_list.csv spray_windows.csv
+
+The forecast has one row per station and hour with station, time, temperature_c,
+rh_percent, wind_kmh and rain_mm columns (.csv or .parquet). The action list is
+the morning report's output (paddock_id, station, risk_level, fungicide_options).
+
+An hour is sprayable when wind, temperature and delta-T are within limits and no
+rain falls before the product is rain-fast. The whole forecast is checked in one
+vectorised pass per distinct rain-fast period, so hundreds of paddocks sharing a
+few stations take well under a second. Windows are ranked by quality and length,
+less a delay penalty that grows with disease risk: at High risk the earliest
+workable window wins, at Low risk a better window later in the week can.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fungicide_products import DEFAULT_RAINFAST_HOURS, rainfast_hours
+
+WIND_MIN_KMH = 3              # below this, surface inversions carry drift
+WIND_MAX_KMH = 15
+TEMP_MAX_C = 28
+DELTA_T_MIN = 2
+DELTA_T_MAX = 10              # 8-10 is marginal and scored lower
+DELTA_T_IDEAL_MAX = 8
+RAIN_MM = 0.2                 # an hour with at least this much rain counts as wet
+MIN_WINDOW_HOURS = 2
+# Longer windows score better up to this many hours
+FULL_WINDOW_HOURS = 6
+TOP_WINDOWS = 3
+# Hours to rain reported when it is already raining, since 0 means none is forecast
+RAINING_NOW_HOURS = 0.5
+# Score lost per hour of waiting, by risk level
+DELAY_PENALTY = {"High": 0.03, "Moderate": 0.01, "Low": 0.003, "Unknown": 0.003}
+FORECAST_COLUMNS = ["station", "time", "temperature_c", "rh_percent", "wind_kmh", "rain_mm"]
+
+
+def load_forecast(path):
+    forecast = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    missing = [col for col in FORECAST_COLUMNS if col not in forecast.columns]
+    if missing:
+        raise ValueError(f"Forecast is missing columns: {', '.join(missing)}")
+    forecast["time"] = pd.to_datetime(forecast["time"])
+    return forecast
+
+
+def wet_bulb_c(temp, rh):
+    """
+    Wet-bulb temperature from air temperature and RH (Stull 2011), accurate to
+    about 0.3 °C over normal spraying conditions.
+    """
+    temp, rh = np.asarray(temp, dtype=float), np.asarray(rh, dtype=float)
+    return (temp * np.arctan(0.151977 * np.sqrt(rh + 8.313659)) + np.arctan(temp + rh)
+            - np.arctan(rh - 1.676331) + 0.00391838 * rh ** 1.5 * np.arctan(0.023101 * rh) - 4.686035)
+
+
+def delta_t(temp, rh):
+    return np.asarray(temp, dtype=float) - wet_bulb_c(temp, rh)
+
+
+def hourly_conditions(forecast):
+    """
+    The forecast sorted by station and time with delta_t, wet, hours_until_rain
+    (from the start of each hour, inf if none is forecast), suitable and quality.
+    """
+    conditions = forecast.sort_values(["station", "time"]).reset_index(drop=True)
+    conditions["delta_t"] = delta_t(conditions["temperature_c"], conditions["rh_percent"]).round(1)
+    conditions["wet"] = conditions["rain_mm"].fillna(0).to_numpy() >= RAIN_MM
+
+    # Hours until the next wet hour within the same station, via the position of the next wet row
+    position = np.arange(len(conditions))
+    wet_rows = position[conditions["wet"].to_numpy()]
+    if len(wet_rows):
+        next_wet = np.searchsorted(wet_rows, position)
+        next_wet_row = np.where(next_wet < len(wet_rows), wet_rows[np.minimum(next_wet, len(wet_rows) - 1)], -1)
+        same_station = (next_wet_row >= 0) & (conditions["station"].to_numpy()[np.maximum(next_wet_row, 0)]
+                                              == conditions["station"].to_numpy())
+        hours = (conditions["time"].to_numpy()[np.maximum(next_wet_row, 0)] - conditions["time"].to_numpy()) \
+            / np.timedelta64(1, "h")
+        conditions["hours_until_rain"] = np.where(same_station, hours, np.inf)
+    else:
+        conditions["hours_until_rain"] = np.inf
+
+    wind, temp, dt = conditions["wind_kmh"], conditions["temperature_c"], conditions["delta_t"]
+    conditions["suitable"] = (wind.between(WIND_MIN_KMH, WIND_MAX_KMH) & (temp <= TEMP_MAX_C)
+                              & dt.between(DELTA_T_MIN, DELTA_T_MAX) & ~conditions["wet"])
+    conditions["quality"] = np.where(dt <= DELTA_T_IDEAL_MAX, 1.0, 0.5)
+    return conditions
+
+
+def find_windows(conditions, rainfast):
+    """
+    Runs of at least MIN_WINDOW_HOURS consecutive hours at one station in which
+    spraying a product needing rainfast dry hours is workable.
+    """
+    sprayable = (conditions["suitable"] & (conditions["hours_until_rain"] >= rainfast + 1)).to_numpy()
+    station = conditions["station"].to_numpy()
+    times = conditions["time"].to_numpy()
+    # A run breaks at a station change or a gap in the hourly series
+    continues = np.zeros(len(conditions), dtype=bool)
+    continues[1:] = (station[1:] == station[:-1]) & (times[1:] - times[:-1] == np.timedelta64(1, "h"))
+    new_run = sprayable & ~(continues & np.roll(sprayable, 1))
+    run_id = np.cumsum(new_run)[sprayable]
+
+    runs = conditions.loc[sprayable].assign(run=run_id).groupby("run")
+    windows = pd.DataFrame({
+        "station": runs["station"].first(),
+        "window_start": runs["time"].first(),
+        "window_end": runs["time"].last() + pd.Timedelta(hours=1),
+        "window_hours": runs.size(),
+        "rain_forecast_hours": runs["hours_until_rain"].first(),
+        "quality": runs["quality"].mean(),
+        "min_delta_t": runs["delta_t"].min(),
+        "max_delta_t": runs["delta_t"].max(),
+        "max_wind_kmh": runs["wind_kmh"].max(),
+    }).reset_index(drop=True)
+    windows["rainfast_hours"] = rainfast
+    return windows[windows["window_hours"] >= MIN_WINDOW_HOURS].reset_index(drop=True)
+
+
+def candidate_products(action_list):
+    """
+    One row per paddock and candidate product, with the product's rain-fast period.
+    """
+    products = action_list[["paddock_id", "station", "risk_level", "fungicide_options"]].copy()
+    products["product"] = products["fungicide_options"].fillna("").str.split(", ")
+    products = products.explode("product").drop(columns="fungicide_options")
+    products = products[products["product"] != ""]
+    products["rainfast_hours"] = products["product"].map(rainfast_hours).fillna(DEFAULT_RAINFAST_HOURS).astype(int)
+    return products
+
+
+def plan_spray_windows(action_list, forecast, now=None, top=TOP_WINDOWS):
+    """
+    The top spray windows per paddock across its candidate products, best first.
+    Paddocks with no workable window in the forecast get one row with no window.
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now()).floor("h")
+    conditions = hourly_conditions(forecast[pd.to_datetime(forecast["time"]) >= now])
+    products = candidate_products(action_list)
+    windows = pd.concat([find_windows(conditions, rainfast) for rainfast in products["rainfast_hours"].unique()]
+                        or [find_windows(conditions, DEFAULT_RAINFAST_HOURS)], ignore_index=True)
+
+    plans = products.merge(windows, on=["station", "rainfast_hours"], how="inner")
+    delay_hours = (plans["window_start"] - now) / pd.Timedelta(hours=1)
+    length = np.minimum(plans["window_hours"], FULL_WINDOW_HOURS) / FULL_WINDOW_HOURS
+    penalty = plans["risk_level"].map(DELAY_PENALTY).fillna(DELAY_PENALTY["Unknown"])
+    plans["score"] = (plans["quality"] * length - delay_hours * penalty).round(3)
+    plans = plans.sort_values(["paddock_id", "score"], ascending=[True, False])
+    plans["rank"] = plans.groupby("paddock_id").cumcount() + 1
+    plans = plans[plans["rank"] <= top]
+
+    unplanned = action_list.loc[~action_list["paddock_id"].isin(plans["paddock_id"]),
+                                ["paddock_id", "station", "risk_level"]]
+    return pd.concat([plans, unplanned], ignore_index=True)
+
+
+def rain_forecast_hours(forecast, now=None):
+    """
+    Hours from now until forecast rain at each station, 0 where none is forecast
+    (the convention check_afren_compliance uses). Rain in the current hour counts
+    as RAINING_NOW_HOURS so it still warns.
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now()).floor("h")
+    conditions = hourly_conditions(forecast[pd.to_datetime(forecast["time"]) >= now])
+    first = conditions.groupby("station").first()
+    hours = first["hours_until_rain"] + (first["time"] - now) / pd.Timedelta(hours=1)
+    return hours.clip(lower=RAINING_NOW_HOURS).replace(np.inf, 0).to_dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("forecast", help="Hourly forecast per station (.csv or .parquet)")
+    parser.add_argument("action_list", help="Morning report action list (.csv or .parquet)")
+    parser.add_argument("output", help="Spray windows to write (.csv or .parquet)")
+    parser.add_argument("--now", default=None, help="Plan from this time instead of the current hour")
+    parser.add_argument("--top", type=int, default=TOP_WINDOWS, help="Windows kept per paddock")
+    args = parser.parse_args()
+
+    from morning_risk_report import read_table, write_table
+
+    started = time.perf_counter()
+    action_list = read_table(args.action_list)
+    plans = plan_spray_windows(action_list, load_forecast(args.forecast), args.now, args.top)
+    write_table(plans, args.output)
+    planned = plans.dropna(subset=["window_start"])["paddock_id"].nunique()
+    print(f"Planned {planned:,} of {len(action_list):,} paddocks in {time.perf_counter() - started:.2f} s "
+          f"-> {args.output}")
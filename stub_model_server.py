@@ -0,0 +1,115 @@
+"""
+Local stand-in for the OpenAI chat completions API, for testing the fungicide
+assistant's latency, streaming and caching offline.
+
+    python stub_model_server.py --port 8700 --first-token-ms 800 --token-ms 30
+    SCA_CHAT_BASE_URL=http://127.0.0.1:8700/v1 streamlit run app.py
+
+Answers POST /v1/chat/completions with or without "stream": true (server-sent
+events, like the real API). Replies are canned text that quotes the question.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_TEMPLATE = (
+    "Stub answer for: {question}. Check the label for registered crops and timing, "
+    "rotate fungicide groups in line with AFREN guidance, and weigh spray cost against "
+    "the expected yield response before applying."
+)
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    first_token_ms = 500
+    token_ms = 20
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        question = next((m["content"] for m in reversed(request.get("messages", [])) if m["role"] == "user"), "")
+        words = REPLY_TEMPLATE.format(question=question.strip()[:200]).split(" ")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "stub")
+        created = int(time.time())
+
+        time.sleep(self.first_token_ms / 1000)
+        if not request.get("stream"):
+            time.sleep(self.token_ms * len(words) / 1000)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            self._write_event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                               "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            time.sleep(self.token_ms / 1000)
+        self._write_event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_event(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubModelServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream or on a kept-alive connection are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host="127.0.0.1", port=8700, first_token_ms=500, token_ms=20):
+    handler = type("Handler", (StubModelHandler,), {"first_token_ms": first_token_ms, "token_ms": token_ms})
+    server = StubModelServer((host, port), handler)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--first-token-ms", type=float, default=500, help="Delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Delay between streamed tokens")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.first_token_ms, args.token_ms)
+    print(f"Stub model server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,194 @@
+"""
+Inverse-distance-weighted (IDW) weather at arbitrary paddock coordinates, from
+the surrounding DPIRD grid cells or the nearest stations.
+
+    lat, lon = registry["lat"], registry["lon"]
+    weather = interpolate_latest_weather(lat, lon)                 # from the grid
+    weather = interpolate_station_weather(lat, lon, station_weather)
+
+Each point's neighbours and normalised weights are worked out once and cached per
+(source, lat, lon), so a repeat lookup is a gather and one dot product. Points
+are handled as arrays throughout, so a whole register is interpolated in one pass.
+Neighbours with no data (e.g. a station that failed to download) are dropped and
+the remaining weights renormalised.
+"""
+import numpy as np
+import pandas as pd
+
+from dpird_weather_fetcher import RAIN_URL, RH_URL, TEMP_URL
+from paddock_registry import (chord_to_km, default_station_index, grid_axes, nearest_cells, nearest_stations,
+                              unit_vectors)
+
+IDW_POWER = 2
+GRID_NEIGHBOURS = 4
+STATION_NEIGHBOURS = 3
+# Grid cells either side of the nearest one searched for neighbours
+SEARCH_RADIUS_CELLS = 1
+# Closer than this a neighbour is taken as the value itself
+EXACT_MATCH_KM = 0.001
+MAX_CACHED_POINTS = 100_000
+# Days read back from the end of a dataset to find each cell's latest value
+LATEST_LOOKBACK_DAYS = 31
+
+# Latest-observation datasets, as used by fetch_weather_from_dpird_live
+LATEST_URLS = {
+    "rain_mm": (RAIN_URL, "rain_day"),
+    "temperature_c": (TEMP_URL, "temp_mean"),
+    "rh_percent": (RH_URL, "rh_mean"),
+}
+
+_weight_cache = {}            # (source key, k, lat, lon) -> (neighbour positions, weights)
+
+
+def idw_weights(distances_km, power=IDW_POWER):
+    """
+    Normalised weights for rows of neighbour distances; a neighbour at the point
+    itself takes all the weight and infinite distances get none.
+    """
+    distances = np.asarray(distances_km, dtype=float)
+    exact = distances < EXACT_MATCH_KM
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / distances ** power
+    weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), weights)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def _cached_weights(source_key, k, lat, lon, compute):
+    """
+    Look up each point's (positions, weights), computing the misses in one
+    vectorised call. Returns arrays shaped (n, k).
+    """
+    lat = np.round(np.asarray(lat, dtype=float), 6)
+    lon = np.round(np.asarray(lon, dtype=float), 6)
+    keys = [(source_key, k, a, b) for a, b in zip(lat.tolist(), lon.tolist())]
+    missing = [i for i, key in enumerate(keys) if key not in _weight_cache]
+    if missing and len(_weight_cache) + len(missing) > MAX_CACHED_POINTS:
+        # Start afresh; this call's earlier hits are recomputed along with the misses
+        _weight_cache.clear()
+        missing = list(range(len(keys)))
+    if missing:
+        positions, weights = compute(lat[missing], lon[missing])
+        for row, i in enumerate(missing):
+            _weight_cache[keys[i]] = (positions[row], weights[row])
+    if not keys:
+        return np.empty((0, k), dtype=int), np.empty((0, k))
+    entries = [_weight_cache[key] for key in keys]
+    return np.stack([e[0] for e in entries]), np.stack([e[1] for e in entries])
+
+
+def apply_weights(values, positions, weights):
+    """
+    Interpolate from source values (shape (..., n_sources)) to the points, skipping
+    NaN sources. Returns shape (..., n_points).
+    """
+    gathered = np.asarray(values, dtype=float)[..., positions]
+    valid = ~np.isnan(gathered)
+    effective = np.where(valid, weights, 0.0)
+    total = effective.sum(axis=-1)
+    weighted = (np.where(valid, gathered, 0.0) * effective).sum(axis=-1)
+    return weighted / np.where(total > 0, total, np.nan)
+
+
+# --- Grid neighbours ---
+def _grid_key(grid_lat, grid_lon):
+    return ("grid", len(grid_lat), float(grid_lat[0]), float(grid_lat[-1]),
+            len(grid_lon), float(grid_lon[0]), float(grid_lon[-1]))
+
+
+def _grid_neighbours(grid_lat, grid_lon, lat, lon, k):
+    n_lat, n_lon = len(grid_lat), len(grid_lon)
+    offsets = np.arange(-SEARCH_RADIUS_CELLS, SEARCH_RADIUS_CELLS + 1)
+    width = len(offsets)
+    lat_idx = nearest_cells(grid_lat, lat)[:, None, None] + offsets[None, :, None]
+    lon_idx = nearest_cells(grid_lon, lon)[:, None, None] + offsets[None, None, :]
+    lat_idx, lon_idx = np.broadcast_arrays(lat_idx, lon_idx)
+    lat_idx, lon_idx = lat_idx.reshape(len(lat), width * width), lon_idx.reshape(len(lat), width * width)
+
+    # Window cells off the edge of the grid are kept as infinitely far away
+    inside = (lat_idx >= 0) & (lat_idx < n_lat) & (lon_idx >= 0) & (lon_idx < n_lon)
+    lat_idx, lon_idx = np.clip(lat_idx, 0, n_lat - 1), np.clip(lon_idx, 0, n_lon - 1)
+    cells = unit_vectors(np.asarray(grid_lat)[lat_idx].ravel(), np.asarray(grid_lon)[lon_idx].ravel())
+    points = np.repeat(unit_vectors(lat, lon), width * width, axis=0)
+    distances = chord_to_km(np.linalg.norm(cells - points, axis=1)).reshape(len(lat), width * width)
+    distances = np.where(inside, distances, np.inf)
+
+    k = min(k, width * width)
+    nearest = np.argsort(distances, axis=1)[:, :k]
+    flat = np.take_along_axis(lat_idx * n_lon + lon_idx, nearest, axis=1)
+    return flat, idw_weights(np.take_along_axis(distances, nearest, axis=1))
+
+
+def grid_weights(grid_lat, grid_lon, lat, lon, k=GRID_NEIGHBOURS):
+    """
+    Each point's k nearest grid cells, as flat lat * n_lon + lon indices, and their IDW weights.
+    """
+    grid_lat, grid_lon = np.asarray(grid_lat, dtype=float), np.asarray(grid_lon, dtype=float)
+    return _cached_weights(_grid_key(grid_lat, grid_lon), k, lat, lon,
+                           lambda a, b: _grid_neighbours(grid_lat, grid_lon, a, b, k))
+
+
+def latest_grid_values(url, variable, cells):
+    """
+    The last valid value of each requested flat grid cell, as a flat array over
+    the whole grid (NaN for cells not requested or with no data in the last
+    LATEST_LOOKBACK_DAYS). Reads one block covering the cells rather than
+    pointwise, which is much faster both locally and over OPeNDAP.
+    """
+    import xarray as xr
+    with xr.open_dataset(url) as ds:
+        n_lat, n_lon = ds.sizes["lat"], ds.sizes["lon"]
+        cells = np.unique(cells)
+        rows, cols = cells // n_lon, cells % n_lon
+        block = ds[variable].isel(time=slice(-LATEST_LOOKBACK_DAYS, None),
+                                  lat=slice(rows.min(), rows.max() + 1),
+                                  lon=slice(cols.min(), cols.max() + 1)).to_numpy()
+    series = block[:, rows - rows.min(), cols - cols.min()]
+    valid = ~np.isnan(series)
+    last = len(series) - 1 - np.argmax(valid[::-1], axis=0)
+    values = np.full(n_lat * n_lon, np.nan)
+    values[cells] = np.where(valid.any(axis=0), series[last, np.arange(len(cells))], np.nan)
+    return values
+
+
+def interpolate_latest_weather(lat, lon, urls=LATEST_URLS, k=GRID_NEIGHBOURS):
+    """
+    Latest rain, temperature and RH at each point, interpolated from the
+    surrounding grid cells. Returns a DataFrame with one row per point.
+    """
+    columns = {}
+    for name, (url, variable) in urls.items():
+        grid_lat, grid_lon = grid_axes(url)
+        positions, weights = grid_weights(grid_lat, grid_lon, lat, lon, k)
+        values = latest_grid_values(url, variable, positions.ravel())
+        columns[name] = np.round(apply_weights(values, positions, weights), 1)
+    return pd.DataFrame(columns)
+
+
+# --- Station neighbours ---
+def station_weights(lat, lon, k=STATION_NEIGHBOURS, index=None):
+    """
+    Each point's k nearest stations, as positions in index["codes"], and their IDW weights.
+    """
+    index = index or default_station_index()
+    source_key = ("stations", tuple(index["codes"]))
+
+    def compute(a, b):
+        distances, positions = nearest_stations(a, b, k, index)
+        return positions, idw_weights(distances)
+
+    return _cached_weights(source_key, min(k, len(index["codes"])), lat, lon, compute)
+
+
+def interpolate_station_weather(lat, lon, station_weather, k=STATION_NEIGHBOURS, index=None,
+                                variables=tuple(LATEST_URLS)):
+    """
+    Weather at each point from its nearest stations' readings, {code: {variable: value}}.
+    Stations missing from station_weather are skipped.
+    """
+    index = index or default_station_index()
+    positions, weights = station_weights(lat, lon, k, index)
+    columns = {}
+    for name in variables:
+        values = np.array([station_weather.get(code, {}).get(name, np.nan) for code in index["codes"]], dtype=float)
+        columns[name] = np.round(apply_weights(values, positions, weights), 1)
+    return pd.DataFrame(columns)
@@ -0,0 +1,321 @@
+"""
+Offline snapshot of daily DPIRD weather for every station in dpird_stations.csv,
+so the pages start without waiting on the network and keep working without it.
+
+    python weather_snapshot.py                 # build or refresh .cache/weather_snapshot.bin
+    python weather_snapshot.py --seasons 3
+
+The file is a fixed layout: an 8-byte magic, a 4-byte little-endian header length,
+a JSON header (stations, variables, first day, days covered per variable and
+year) padded to 64 bytes, then one float32 array shaped (variable, station, day)
+with NaN where there is no data. Readers memory-map the array, so a station's
+season is a view of the file rather than a copy and opening the snapshot costs
+the same whatever its size.
+
+Refreshes rebuild only the current season (and any season the old snapshot
+lacks) and replace the file atomically; processes holding the old file keep
+reading it until they next call open_snapshot().
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from dpird_weather_fetcher import DAILY_URLS, DPIRD_URL, THREDDS_URL, load_station_table
+
+SNAPSHOT_PATH = os.environ.get("SCA_WEATHER_SNAPSHOT",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache",
+                                            "weather_snapshot.bin"))
+MAGIC = b"SCAWX01\0"
+HEADER_ALIGN = 64
+# Enough completed years for the nitrogen page's long-term rainfall means, plus this one
+SNAPSHOT_SEASONS = 11
+# A snapshot older than this is refreshed in the background when a page starts
+REFRESH_AFTER_HOURS = 6
+# Another process refreshing for longer than this is assumed to have died
+REFRESH_LOCK_SECONDS = 60 * 60
+# Wait this long after a failed refresh (e.g. DPIRD down) before trying again
+REFRESH_RETRY_MINUTES = 30
+# Set SCA_SNAPSHOT_REFRESH=0 (or this to False) to never refresh from the pages, e.g. under test
+BACKGROUND_REFRESH = os.environ.get("SCA_SNAPSHOT_REFRESH", "1") != "0"
+
+
+# --- Reading ---
+class WeatherSnapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a weather snapshot")
+            header_len = int.from_bytes(f.read(4), "little")
+            self.header = json.loads(f.read(header_len))
+        self.path = path
+        self.start = date.fromisoformat(self.header["start"])
+        self.variables = self.header["variables"]
+        self.stations = {code: i for i, code in enumerate(self.header["stations"])}
+        self.data = np.memmap(path, dtype="<f4", mode="r", offset=self.header["data_offset"],
+                              shape=(len(self.variables), len(self.stations), self.header["n_days"]))
+
+    def age_hours(self):
+        return (datetime.now() - datetime.fromisoformat(self.header["created"])).total_seconds() / 3600
+
+    def coverage(self, variable, year):
+        """
+        (last day held, whether the season is complete) for a variable and year,
+        or (None, False) if the snapshot doesn't hold it.
+        """
+        held = self.header["coverage"].get(variable, {}).get(str(year))
+        if held is None:
+            return None, False
+        return date.fromisoformat(held["through"]), held["complete"]
+
+    def series(self, code, variable, start, end):
+        """
+        Daily values from start to end inclusive as a float Series without NaN
+        days, backed by the mapped file.
+        """
+        offset = (start - self.start).days
+        values = self.data[self.variables.index(variable), self.stations[code],
+                           max(offset, 0):max((end - self.start).days + 1, 0)]
+        index = pd.date_range(self.start + timedelta(days=max(offset, 0)), periods=len(values), freq="D",
+                              unit="ns", name="date")
+        series = pd.Series(values, index=index, copy=False)
+        return series[~np.isnan(values)].astype(float)
+
+    def daily(self, code, year, start=None, variables=("rain_mm", "temperature_c")):
+        """
+        The snapshot's part of fetch_daily_weather(code, year, start, variables), as
+        (DataFrame, day to fetch live from or None if the snapshot covers the year).
+        None for both if the snapshot lacks the station or any variable's season.
+        """
+        if code not in self.stations:
+            return None, None
+        start = max(pd.Timestamp(start).date() if start is not None else date(year, 1, 1), date(year, 1, 1))
+        coverage = [self.coverage(name, year) for name in variables]
+        if any(through is None for through, _ in coverage):
+            return None, None
+        through = min(through for through, _ in coverage)
+        columns = {name: self.series(code, name, start, min(through, date(year, 12, 31))) for name in variables}
+        daily = pd.DataFrame(columns)
+        daily.index.name = "date"
+        complete = all(done for _, done in coverage)
+        return daily, None if complete else max(start, through + timedelta(days=1))
+
+    def latest(self, code, variable):
+        """
+        (date, value) of the station's last observation, or (None, None).
+        """
+        values = self.data[self.variables.index(variable), self.stations[code]]
+        valid = np.flatnonzero(~np.isnan(values))
+        if not len(valid):
+            return None, None
+        return self.start + timedelta(days=int(valid[-1])), float(values[valid[-1]])
+
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def open_snapshot(path=None, source=None):
+    """
+    The snapshot at path (default SNAPSHOT_PATH), or None if there isn't one or,
+    given source, it was built from a different THREDDS server. Re-opened only
+    when the file has been replaced since the last call.
+    """
+    path = path or SNAPSHOT_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _open_lock:
+        cached = _open.get(path)
+        if cached is None or cached[0] != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                cached = _open[path] = ((stat.st_ino, stat.st_mtime_ns), WeatherSnapshot(path))
+            except (OSError, ValueError):
+                return None
+    if source is not None and cached[1].header.get("source") != source:
+        return None
+    return cached[1]
+
+
+# --- Building ---
+def _station_block(url, variable, lats, lons):
+    """
+    One season of a variable at each station's nearest grid cell, shaped
+    (station, day), with the season's dates.
+    """
+    import xarray as xr
+    with xr.open_dataset(url) as ds:
+        rows = np.abs(ds["lat"].to_numpy()[:, None] - lats).argmin(axis=0)
+        cols = np.abs(ds["lon"].to_numpy()[:, None] - lons).argmin(axis=0)
+        unique_rows, row_pos = np.unique(rows, return_inverse=True)
+        unique_cols, col_pos = np.unique(cols, return_inverse=True)
+        # Read only the rows and columns holding a station, then pick the cells out of that
+        block = ds[variable].isel(lat=unique_rows, lon=unique_cols).to_numpy()
+        dates = pd.DatetimeIndex(ds["time"].to_numpy()).normalize()
+    return block[:, row_pos, col_pos].T, dates
+
+
+def build_snapshot(path=None, seasons=SNAPSHOT_SEASONS, today=None, previous=None):
+    """
+    Write a snapshot of the last `seasons` calendar years for every station from
+    THREDDS_URL. Completed seasons already in previous (if built from the same
+    server) are copied rather than fetched again. Seasons are only marked complete
+    when they come from the DPIRD server itself, so a snapshot built from local
+    files (e.g. the benchmark fixtures) is never trusted as final.
+    Returns the header written.
+    """
+    path = path or SNAPSHOT_PATH
+    today = today or date.today()
+    if previous is not None and previous.header.get("source") != THREDDS_URL:
+        previous = None
+    stations = load_station_table()
+    codes = stations["code"].tolist()
+    variables = list(DAILY_URLS)
+    years = list(range(today.year - seasons + 1, today.year + 1))
+    start = date(years[0], 1, 1)
+    n_days = (date(today.year, 12, 31) - start).days + 1
+    data = np.full((len(variables), len(codes), n_days), np.nan, dtype="<f4")
+    coverage = {name: {} for name in variables}
+
+    def copy_previous(v, name, year):
+        days = (date(year, 12, 31) - date(year, 1, 1)).days + 1
+        first, old_first = (date(year, 1, 1) - start).days, (date(year, 1, 1) - previous.start).days
+        for s, code in enumerate(codes):
+            if code in previous.stations:
+                data[v, s, first:first + days] = previous.data[previous.variables.index(name),
+                                                               previous.stations[code], old_first:old_first + days]
+
+    fetched, failures = 0, []
+    for v, name in enumerate(variables):
+        url, variable = DAILY_URLS[name]
+        for year in years:
+            through, complete = previous.coverage(name, year) if previous else (None, False)
+            if complete:
+                copy_previous(v, name, year)
+                coverage[name][str(year)] = {"through": through.isoformat(), "complete": True}
+                continue
+            try:
+                block, dates = _station_block(url.format(year=year), variable,
+                                              stations["lat"].to_numpy(), stations["lon"].to_numpy())
+            except (OSError, KeyError, ValueError) as e:
+                # Not published (yet), or DPIRD unreachable: keep whatever the old snapshot had
+                failures.append(f"{name} {year}: {e}")
+                if through is not None:
+                    copy_previous(v, name, year)
+                    coverage[name][str(year)] = {"through": through.isoformat(), "complete": False}
+                continue
+            fetched += 1
+            positions = (dates - pd.Timestamp(start)).days.to_numpy()
+            data[v][:, positions] = block
+            has_data = dates[~np.isnan(block).all(axis=0)]
+            last = has_data.max().date() if len(has_data) else date(year, 1, 1) - timedelta(days=1)
+            coverage[name][str(year)] = {"through": last.isoformat(), "complete": year < today.year and THREDDS_URL == DPIRD_URL}
+    if failures and not fetched:
+        # Nothing could be read at all, so leave the existing snapshot alone
+        raise RuntimeError(f"DPIRD unreachable ({failures[0]})")
+
+    header = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source": THREDDS_URL,
+        "start": start.isoformat(),
+        "n_days": n_days,
+        "stations": codes,
+        "variables": variables,
+        "coverage": coverage,
+    }
+    encoded = json.dumps(header).encode()
+    # The data offset depends on the header length, which includes the offset itself
+    data_offset = -(-(len(MAGIC) + 4 + len(encoded) + 32) // HEADER_ALIGN) * HEADER_ALIGN
+    header["data_offset"] = data_offset
+    encoded = json.dumps(header).encode().ljust(data_offset - len(MAGIC) - 4)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+        f.write(data.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+def refresh_snapshot(path=None, seasons=SNAPSHOT_SEASONS, today=None):
+    """
+    Rebuild the snapshot unless another process is already doing so. Returns the
+    new header, or None if another refresh holds the lock.
+    """
+    path = path or SNAPSHOT_PATH
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if time.time() - os.path.getmtime(lock_path) > REFRESH_LOCK_SECONDS:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return None
+    try:
+        return build_snapshot(path, seasons, today, previous=open_snapshot(path))
+    finally:
+        os.remove(lock_path)
+
+
+_refresh_thread = None
+last_refresh_error = None
+_last_failure = 0.0
+
+
+def start_background_refresh(path=None, max_age_hours=REFRESH_AFTER_HOURS):
+    """
+    Refresh the snapshot in a daemon thread if it is missing or older than
+    max_age_hours. Returns at once; failures (e.g. DPIRD unreachable) are kept
+    in last_refresh_error and retried no sooner than REFRESH_RETRY_MINUTES later.
+    """
+    global _refresh_thread
+    path = path or SNAPSHOT_PATH
+    if not BACKGROUND_REFRESH or time.time() - _last_failure < REFRESH_RETRY_MINUTES * 60:
+        return
+    try:
+        if time.time() - os.path.getmtime(path) < max_age_hours * 3600:
+            return
+    except OSError:
+        pass
+    with _open_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+
+        def run():
+            global last_refresh_error, _last_failure
+            try:
+                refresh_snapshot(path)
+                last_refresh_error = None
+            except Exception as e:
+                last_refresh_error = f"{type(e).__name__}: {e}"
+                _last_failure = time.time()
+
+        _refresh_thread = threading.Thread(target=run, name="weather-snapshot-refresh", daemon=True)
+        _refresh_thread.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default=SNAPSHOT_PATH, help="Snapshot file to write (or set SCA_WEATHER_SNAPSHOT)")
+    parser.add_argument("--seasons", type=int, default=SNAPSHOT_SEASONS, help="Calendar years to keep")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    header = build_snapshot(args.path, args.seasons, previous=open_snapshot(args.path))
+    missing = [f"{name} {year}" for name in header["variables"]
+               for year in range(date.today().year - args.seasons + 1, date.today().year + 1)
+               if str(year) not in header["coverage"][name]]
+    print(f"Wrote {len(header['stations'])} stations x {args.seasons} seasons "
+          f"({os.path.getsize(args.path) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f} s -> {args.path}")
+    if missing:
+        print(f"Not available from DPIRD: {', '.join(missing)}")